@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from . import metrics
+
+USER_CACHE_KEY = 'auth:user:{}'
+# Поля пользователя, которые хранятся в кэше: их хватает проверкам прав.
+USER_FIELDS = ('id', 'role', 'is_staff', 'is_superuser', 'is_active')
+
+
+def forget_user(user_id):
+    cache.delete(USER_CACHE_KEY.format(user_id))
+
+
+def projection(values):
+    """Пользователь из значений USER_FIELDS, остальные поля отложены."""
+    model = get_user_model()
+    values = dict(zip(USER_FIELDS, values))
+    # from_db ждёт значения в порядке полей модели.
+    names = [field.attname for field in model._meta.concrete_fields
+             if field.attname in values]
+    return model.from_db(None, names, [values[name] for name in names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Берёт поля пользователя USER_FIELDS из кэша на JWT_USER_CACHE_TTL
+    секунд вместо запроса к базе на каждый запрос. request.user — объект
+    с отложенными остальными полями: они догружаются при обращении.
+    Запросы на запись получают строку пользователя из базы целиком, поэтому
+    сохранение не затирает свежие данные, а запись с устаревшей ролью
+    невозможна. Запись кэша удаляется при сохранении и удалении
+    пользователя; процессы с другим кэшем видят смену роли в чтениях
+    не позже чем через JWT_USER_CACHE_TTL секунд.
+    """
+
+    def authenticate(self, request):
+        started = time.perf_counter()
+        self.fresh = request.method not in SAFE_METHODS
+        try:
+            return super().authenticate(request)
+        finally:
+            metrics.AUTH_SECONDS.observe(time.perf_counter() - started)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                'Token contained no recognizable user identification')
+        key = USER_CACHE_KEY.format(user_id)
+        if getattr(self, 'fresh', False):
+            user = super().get_user(validated_token)
+            values = tuple(getattr(user, field) for field in USER_FIELDS)
+            cache.set(key, values, timeout=settings.JWT_USER_CACHE_TTL)
+            return user
+        values = cache.get(key)
+        if values is None:
+            values = get_user_model().objects.filter(**{
+                api_settings.USER_ID_FIELD: user_id}).values_list(
+                *USER_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed('User not found',
+                                           code='user_not_found')
+            cache.set(key, values, timeout=settings.JWT_USER_CACHE_TTL)
+        user = projection(values)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user
@@ -0,0 +1,257 @@
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from reviews.models import Category, Genre, GenreTitle, Review, Title, User
+
+from . import cache
+from .signals import INVALIDATES
+
+
+def batch_items(request):
+    """Объекты из тела пакетного запроса: непустой список словарей."""
+    items = request.data
+    if (not isinstance(items, list) or not items
+            or not all(isinstance(item, dict) for item in items)):
+        raise serializers.ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список объектов.']})
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise serializers.ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {settings.BULK_MAX_ITEMS} объектов за запрос.']})
+    return items
+
+
+def related_by_slug(items, fields):
+    """
+    Объекты, на которые ссылаются элементы пакета, одним запросом
+    на модель: {модель: {slug: объект}}. fields — {поле: модель}.
+    """
+    slugs = {}
+    for item in items:
+        for field, model in fields.items():
+            values = item.get(field)
+            if not isinstance(values, list):
+                values = [values]
+            slugs.setdefault(model, set()).update(
+                value for value in values if isinstance(value, str))
+    return {model: model.objects.in_bulk(values, field_name='slug')
+            for model, values in slugs.items()}
+
+
+def insert(model, objects):
+    """
+    bulk_create, если СУБД возвращает id вставленных строк. Иначе
+    (SQLite) объекты сохраняются по одному: id нужны для связей и ответа.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects)
+    for obj in objects:
+        obj.save()
+    return objects
+
+
+def bulk_response(results):
+    """
+    Результаты в порядке элементов запроса. 201/200 — всё записано,
+    207 — записана часть, 400 — ничего.
+    """
+    failed = sum('errors' in result for result in results)
+    if not failed:
+        code = max(result['status'] for result in results)
+    elif failed < len(results):
+        code = status.HTTP_207_MULTI_STATUS
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return Response(results, status=code)
+
+
+def success(data, code=status.HTTP_201_CREATED):
+    return {'status': code, 'data': data}
+
+
+def failure(errors):
+    return {'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
+
+
+def create_groups(serializer_class, items, context):
+    """Пакет категорий или жанров: занятые slug проверяются одним запросом."""
+    model = serializer_class.Meta.model
+    taken = set(model.objects.filter(slug__in=[
+        item.get('slug') for item in items
+        if isinstance(item.get('slug'), str)]).values_list('slug', flat=True))
+    context = {**context, 'taken_slugs': taken}
+    results = []
+    for item in items:
+        serializer = serializer_class(data=item, context=context)
+        if not serializer.is_valid():
+            results.append(failure(serializer.errors))
+            continue
+        taken.add(serializer.validated_data['slug'])
+        results.append(model(**serializer.validated_data))
+    while True:
+        objects = [result for result in results if isinstance(result, model)]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objects)
+                cache.bump(*INVALIDATES[model])
+            break
+        except IntegrityError:
+            # Параллельный запрос успел занять slug: такие элементы
+            # отклоняются, остальные записываются заново.
+            raced = set(model.objects.filter(slug__in=[
+                obj.slug for obj in objects]).values_list('slug', flat=True))
+            if not raced:
+                raise
+            results = [
+                failure({'slug': ['Такой slug уже существует.']})
+                if isinstance(result, model) and result.slug in raced
+                else result for result in results]
+    return [success(serializer_class(result).data)
+            if isinstance(result, model) else result for result in results]
+
+
+def titles_written(title_ids, category_ids, genre_ids):
+    """
+    Поиск и счётчики категорий и жанров после записи пакета
+    произведений в обход сигналов.
+    """
+    Title.objects.filter(pk__in=title_ids).rebuild_search_index()
+    Category.objects.filter(pk__in=category_ids).rebuild_title_counts()
+    Genre.objects.filter(pk__in=genre_ids).rebuild_title_counts()
+
+
+def create_titles(serializer_class, items, context):
+    """
+    Пакет произведений: проверка сериализатором произведения, slug
+    категорий и жанров — одним запросом на модель, вставка строк
+    произведений и связей с жанрами — по одному bulk_create.
+    """
+    context = {**context, 'related': related_by_slug(
+        items, {'category': Category, 'genre': Genre})}
+    results, titles, links = [], [], []
+    for item in items:
+        serializer = serializer_class(data=item, context=context)
+        if not serializer.is_valid():
+            results.append(failure(serializer.errors))
+            continue
+        data = dict(serializer.validated_data)
+        genres = dict.fromkeys(data.pop('genre'))
+        title = Title(**data)
+        titles.append(title)
+        links.append((title, genres))
+        results.append(None)
+    with transaction.atomic():
+        insert(Title, titles)
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for title, genres in links for genre in genres)
+        titles_written([title.pk for title in titles],
+                       {title.category_id for title in titles},
+                       {genre.pk for _, genres in links for genre in genres})
+        cache.bump(*INVALIDATES[Title])
+    prefetch_related_objects(titles, 'genre')
+    created = iter(titles)
+    return [result or success(serializer_class(next(created)).data)
+            for result in results]
+
+
+def update_titles(serializer_class, items, context):
+    """
+    Частичное изменение пакета произведений по id: строки читаются
+    и записываются одним запросом (bulk_update), жанры заменяются
+    у тех произведений, где они переданы.
+    """
+    # bool — подкласс int, но true не id.
+    ids = [item.get('id') for item in items]
+    ids = [pk if isinstance(pk, int) and not isinstance(pk, bool) else None
+           for pk in ids]
+    instances = Title.objects.in_bulk([pk for pk in ids if pk is not None])
+    context = {**context, 'related': related_by_slug(
+        items, {'category': Category, 'genre': Genre})}
+    results, titles, fields, links = [], [], set(), {}
+    category_ids = set()
+    for pk, item in zip(ids, items):
+        title = instances.get(pk)
+        if title is None:
+            results.append(failure({'id': ['Произведение не найдено.']}))
+            continue
+        serializer = serializer_class(
+            title, data=item, partial=True, context=context)
+        if not serializer.is_valid():
+            results.append(failure(serializer.errors))
+            continue
+        data = dict(serializer.validated_data)
+        if 'genre' in data:
+            links[pk] = dict.fromkeys(data.pop('genre'))
+        category_ids.add(title.category_id)
+        for field, value in data.items():
+            setattr(title, field, value)
+        category_ids.add(title.category_id)
+        fields.update(data)
+        titles.append(title)
+        results.append(title)
+    with transaction.atomic():
+        if titles and fields:
+            Title.objects.bulk_update(titles, fields)
+        genre_ids = set(GenreTitle.objects.filter(
+            title__in=links).values_list('genre', flat=True))
+        # Счётчики жанров и кэш пересчитываются ниже один раз на пакет.
+        GenreTitle.objects.delete_for_titles(links)
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title_id=pk, genre=genre)
+            for pk, genres in links.items() for genre in genres)
+        genre_ids.update(genre.pk for genres in links.values()
+                         for genre in genres)
+        title_ids = {title.pk for title in titles}
+        titles_written(title_ids, category_ids - {None}, genre_ids - {None})
+        # Название произведения выводится в его отзывах.
+        cache.bump(*INVALIDATES[Title],
+                   *(f'reviews:{pk}' for pk in title_ids))
+    prefetch_related_objects(titles, 'genre', 'category')
+    return [success(serializer_class(result).data, status.HTTP_200_OK)
+            if isinstance(result, Title) else result for result in results]
+
+
+def create_reviews(serializer_class, title, items, context):
+    """
+    Пакет отзывов к произведению от имени авторов из поля author.
+    Авторы и их прежние отзывы читаются одним запросом, рейтинг
+    и распределение оценок пересчитываются один раз на пакет.
+    """
+    usernames = [item.get('author') for item in items]
+    authors = User.objects.in_bulk(
+        [name for name in usernames if isinstance(name, str)],
+        field_name='username')
+    reviewed = set(title.review.filter(author__in=authors.values())
+                   .values_list('author', flat=True))
+    results, reviews = [], []
+    for username, item in zip(usernames, items):
+        serializer = serializer_class(data=item, context=context)
+        errors = {} if serializer.is_valid() else dict(serializer.errors)
+        author = (authors.get(username) if isinstance(username, str)
+                  else None)
+        if author is None:
+            errors['author'] = ['Пользователь не найден.']
+        elif author.pk in reviewed:
+            errors.setdefault(api_settings.NON_FIELD_ERRORS_KEY, []).append(
+                'Пользователь может оставить только один отзыв.')
+        if errors:
+            results.append(failure(errors))
+            continue
+        reviewed.add(author.pk)
+        reviews.append(Review(title=title, author=author,
+                              **serializer.validated_data))
+        results.append(None)
+    with transaction.atomic():
+        insert(Review, reviews)
+        titles = Title.objects.filter(pk=title.pk)
+        titles.rebuild_ratings()
+        titles.rebuild_score_histograms()
+        cache.bump(*INVALIDATES[Review], f'reviews:{title.pk}')
+    created = iter(reviews)
+    return [result or success(serializer_class(next(created)).data)
+            for result in results]
@@ -0,0 +1,190 @@
+import hashlib
+import pickle
+import threading
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from reviews.models import CacheVersion
+
+from . import metrics
+
+
+class CacheStats:
+    """Счётчики попаданий в кэш ответов текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.stored_bytes = 0
+        self.stored_entries = 0
+
+    def hit(self):
+        with self.lock:
+            self.hits += 1
+        metrics.CACHE_HITS.inc()
+
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+        metrics.CACHE_MISSES.inc()
+
+    def store(self, size):
+        with self.lock:
+            self.stored_bytes += size
+            self.stored_entries += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else None,
+            'stored_bytes': self.stored_bytes,
+            'stored_entries': self.stored_entries,
+            'average_entry_bytes': (self.stored_bytes // self.stored_entries
+                                    if self.stored_entries else None),
+        }
+
+
+stats = CacheStats()
+
+
+def get_versions(namespaces):
+    """
+    Версии пространств имён кэша и время их изменения, одним запросом
+    к таблице CacheVersion. К пространствам добавляется общее
+    CacheVersion.CATALOGUE. Пространство без строки — версия 0.
+    """
+    namespaces = (CacheVersion.CATALOGUE, *namespaces)
+    rows = {namespace: (version, updated.timestamp())
+            for namespace, version, updated in CacheVersion.objects.filter(
+                namespace__in=namespaces).values_list(
+                'namespace', 'version', 'updated')}
+    return tuple(rows.get(namespace, (0, 0.0)) for namespace in namespaces)
+
+
+def request_versions(request, namespaces):
+    """get_versions, запомненные на время запроса."""
+    memo = getattr(request, '_cache_versions', None)
+    if memo is None:
+        memo = request._cache_versions = {}
+    key = tuple(namespaces)
+    if key not in memo:
+        memo[key] = get_versions(key)
+    return memo[key]
+
+
+def bump(*namespaces):
+    """
+    Делает записи пространств имён недействительными после фиксации
+    транзакции записи: строку версии не держит заблокированной вся
+    транзакция, и параллельные записи не ждут друг друга. Запрос между
+    фиксацией и сдвигом кладёт новые данные под прежнюю версию,
+    и после сдвига они просто не читаются.
+    """
+    transaction.on_commit(partial(CacheVersion.objects.bump, *namespaces))
+
+
+def forget(*namespaces):
+    """Удаляет версии пространств удалённых объектов после фиксации."""
+    transaction.on_commit(partial(CacheVersion.objects.forget, *namespaces))
+
+
+def normalized_params(request, query_params):
+    return sorted(
+        (name, value.strip())
+        for name in query_params
+        for value in request.query_params.getlist(name)
+        if value.strip())
+
+
+def response_key(namespaces, request, query_params):
+    # Ссылки next/previous в ответе абсолютные: схема и хост входят в ключ.
+    source = repr((request_versions(request, namespaces), request.scheme,
+                   request.get_host(), request.path,
+                   normalized_params(request, query_params)))
+    digest = hashlib.md5(source.encode()).hexdigest()
+    return f'catalogue:response:{digest}'
+
+
+class CachedResponseMixin:
+    """
+    Кэширует данные успешных GET-ответов списка. Ключ строится из пути,
+    параметров cache_query_params и версий пространств cache_namespaces.
+    """
+    cache_namespaces = ()
+    cache_query_params = ('limit', 'offset')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = response_key(self.cache_namespaces, request,
+                           self.cache_query_params)
+        payload = cache.get(key)
+        if payload is not None:
+            stats.hit()
+            return Response(pickle.loads(payload))
+        stats.miss()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            # В кэш кладутся готовые байты, их размер и идёт в статистику.
+            payload = pickle.dumps(response.data, pickle.HIGHEST_PROTOCOL)
+            cache.set(key, payload)
+            stats.store(len(payload))
+        return response
+
+
+class CachedDetailMixin(CachedResponseMixin):
+    """То же для ответов на запрос отдельного объекта."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 на If-None-Match/If-Modified-Since одним запросом версий,
+    без выборки страницы и сериализации. ETag строится из версий
+    пространств кэша, пути, параметров запроса и выбранного формата ответа,
+    Last-Modified — время последнего изменения этих пространств.
+    """
+
+    def get_version_namespaces(self):
+        return self.cache_namespaces
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        versions = request_versions(request, self.get_version_namespaces())
+        source = repr((versions, request.path,
+                       sorted(request.query_params.lists()),
+                       request.accepted_media_type))
+        etag = f'"{hashlib.md5(source.encode()).hexdigest()}"'
+        # До первого изменения пространств Last-Modified не отдаётся.
+        last_modified = int(max(updated for _, updated in versions)) or None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,73 @@
+import threading
+
+from django.db import connections
+
+
+def get_pools():
+    """Пулы соединений процесса (ENGINE api_yamdb.db.postgresql_pool)."""
+    pools = {}
+    for connection in connections.all():
+        pool = getattr(connection, 'get_pool', lambda: None)()
+        if pool is not None:
+            pools[connection.alias] = pool
+    return pools
+
+
+class ConnectionStats:
+    """
+    Сколько соединений с базой открыл процесс на обслуженные запросы.
+    Соединение из пула открывается один раз и потом только выдаётся,
+    поэтому для пулов считаются открытия в самом пуле.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.pools_opened = self.count_pools_opened()
+
+    def count_pools_opened(self):
+        return sum(pool.opened for pool in get_pools().values())
+
+    def request_served(self):
+        with self.lock:
+            self.requests += 1
+
+    def connection_opened(self, connection):
+        # Выдачу соединения из пула connection_created не отличает.
+        if getattr(connection, 'get_pool', None) is not None:
+            return
+        with self.lock:
+            self.connections_opened += 1
+
+    def as_dict(self):
+        opened = (self.connections_opened + self.count_pools_opened()
+                  - self.pools_opened)
+        return {
+            'requests': self.requests,
+            'connections_opened': opened,
+            'connections_per_request': (
+                opened / self.requests if self.requests else None),
+            'pools': {alias: pool.as_dict()
+                      for alias, pool in get_pools().items()},
+        }
+
+
+stats = ConnectionStats()
+
+
+def check_connections():
+    """
+    Закрывает соединения, которые перестали отвечать, чтобы запрос открыл
+    новое, а не упал на первом обращении к базе. Включается ключом
+    CONN_HEALTH_CHECKS в настройках базы и стоит одного SELECT 1.
+    """
+    for connection in connections.all():
+        if (connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,140 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from reviews.models import MailOutbox
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """
+    Фоновая отправка писем из процесса приложения. Письма копятся в очереди,
+    рабочий поток отправляет их пачками через одно соединение с почтовым
+    сервером и повторяет неудачные попытки с растущей паузой.
+    При MAIL_QUEUE_DURABLE письма сначала записываются в таблицу MailOutbox,
+    так что неотправленные после падения процесса отправит send_outbox.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'MAIL_QUEUE_BATCH_SIZE', 50)
+
+    @property
+    def retries(self):
+        return getattr(settings, 'MAIL_QUEUE_RETRIES', 3)
+
+    @property
+    def backoff(self):
+        return getattr(settings, 'MAIL_QUEUE_BACKOFF', 1.0)
+
+    @property
+    def durable(self):
+        return getattr(settings, 'MAIL_QUEUE_DURABLE', False)
+
+    @property
+    def claim_timeout(self):
+        return getattr(settings, 'MAIL_OUTBOX_CLAIM_TIMEOUT', 600)
+
+    def send_mail(self, subject, message, recipient_list, from_email=None):
+        if not self.durable:
+            self.put(EmailMessage(subject, message, from_email,
+                                  recipient_list))
+            return
+        row = MailOutbox.objects.create(
+            subject=subject, message=message, from_email=from_email or '',
+            recipients=','.join(recipient_list))
+        transaction.on_commit(lambda: self.put(row.pk))
+
+    def put(self, item):
+        self.ensure_worker()
+        self.queue.put(item)
+        metrics.MAIL_QUEUE_DEPTH.set(self.queue.qsize())
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def flush(self):
+        """Ждёт, пока рабочий поток отправит всё, что есть в очереди."""
+        self.queue.join()
+
+    def ensure_worker(self):
+        # После fork в дочернем процессе потока нет, запускаем новый.
+        if self.thread is not None and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(
+                    target=self.run, name='mail-queue', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.deliver(batch)
+            except Exception:
+                logger.exception('Не удалось отправить %s писем', len(batch))
+            finally:
+                close_old_connections()
+                metrics.MAIL_QUEUE_DEPTH.set(self.queue.qsize())
+                for _ in batch:
+                    self.queue.task_done()
+
+    def deliver(self, batch):
+        """
+        Отправляет пачку и возвращает число отправленных писем.
+        Строки MailOutbox сначала забираются на отправку: строку, которую
+        уже отправляет другой процесс или send_outbox, пачка пропускает.
+        """
+        messages = [item for item in batch if isinstance(item, EmailMessage)]
+        row_ids = [item for item in batch if isinstance(item, int)]
+        rows = (MailOutbox.objects.filter(pk__in=row_ids).claim(
+            self.claim_timeout) if row_ids else [])
+        messages += [outbox_message(row) for row in rows]
+        if not messages:
+            return 0
+        claimed = MailOutbox.objects.filter(pk__in=[row.pk for row in rows])
+        for attempt in range(self.retries + 1):
+            try:
+                get_connection().send_messages(messages)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    # Строки возвращаются в очередь для send_outbox.
+                    claimed.update(attempts=F('attempts') + attempt + 1,
+                                   claimed=None, claimed_by='')
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+        claimed.update(sent=timezone.now(),
+                       attempts=F('attempts') + attempt + 1)
+        return len(messages)
+
+
+def outbox_message(row):
+    return EmailMessage(row.subject, row.message, row.from_email or None,
+                        row.recipients.split(','))
+
+
+mail_queue = MailQueue()
@@ -0,0 +1,145 @@
+import json
+import re
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Comments, Genre, Review, Title
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def normalize_sql(sql):
+    """Заменяет литералы, чтобы запросы N+1 считались одинаковыми."""
+    return re.sub(r"'(?:[^']|'')*'|\b\d+\b", '?', sql)
+
+
+def rows_scanned(sql):
+    """
+    Сумма строк, прочитанных узлами сканирования, по EXPLAIN ANALYZE.
+    Доступно только в PostgreSQL, для остальных баз возвращает None.
+    """
+    if connection.vendor != 'postgresql' or not sql.startswith('SELECT'):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}')
+        plan = cursor.fetchone()[0][0]['Plan']
+    total = 0
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'].endswith('Scan'):
+            total += node['Actual Rows'] * node['Actual Loops']
+        nodes.extend(node.get('Plans', ()))
+    return total
+
+
+def build_scenarios():
+    """Маршруты из api/urls.py с параметрами из текущих данных."""
+    hot_title = Title.objects.order_by('-review_count').first()
+    if hot_title is None:
+        raise CommandError('База пуста, сначала выполните generate_data')
+    hot_review = (Review.objects.annotate(comment_count=Count('comments'))
+                  .order_by('-comment_count').first())
+    genre = Genre.objects.order_by('-title_count').first()
+    category = Category.objects.first()
+    last_offset = max(Title.objects.count() - 10, 0)
+    reviews_url = f'/api/v1/titles/{hot_title.id}/reviews/'
+    scenarios = {
+        'categories-list': '/api/v1/categories/',
+        'genres-list': '/api/v1/genres/',
+        'genres-facets': '/api/v1/genres/facets/',
+        'categories-facets': '/api/v1/categories/facets/',
+        'titles-list': '/api/v1/titles/',
+        'titles-list-last-page': f'/api/v1/titles/?offset={last_offset}',
+        'titles-list-genre': f'/api/v1/titles/?genre={genre.slug}',
+        'titles-list-category': f'/api/v1/titles/?category={category.slug}',
+        'titles-list-year': f'/api/v1/titles/?year={hot_title.year}',
+        'titles-list-name': f'/api/v1/titles/?name={hot_title.name}',
+        'titles-top-rated': '/api/v1/titles/?ordering=-rating&cursor=',
+        'titles-top-rated-genre': (
+            f'/api/v1/titles/?genre={genre.slug}&ordering=-rating'),
+        'titles-search': f'/api/v1/titles/?search={hot_title.name}',
+        'titles-autocomplete': (
+            f'/api/v1/titles/autocomplete/?q={hot_title.name[:4]}'),
+        'titles-detail': f'/api/v1/titles/{hot_title.id}/',
+        'titles-scores': f'/api/v1/titles/{hot_title.id}/scores/',
+        'reviews-list': reviews_url,
+        'reviews-list-last-page': (
+            f'{reviews_url}?offset={max(hot_title.review_count - 10, 0)}'),
+        'reviews-list-cursor': f'{reviews_url}?cursor=',
+    }
+    if hot_review is not None:
+        scenarios['comments-list'] = (
+            f'/api/v1/titles/{hot_review.title_id}/reviews/'
+            f'{hot_review.id}/comments/')
+    return scenarios
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет запросы к маршрутам API через тестовый клиент и '
+            'сохраняет задержки и число SQL-запросов в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+        parser.add_argument(
+            '--only', nargs='+', help='Запустить только эти сценарии.')
+
+    def handle(self, *args, **options):
+        client = Client()
+        scenarios = build_scenarios()
+        if options['only']:
+            scenarios = {name: url for name, url in scenarios.items()
+                         if name in options['only']}
+        report = {
+            'vendor': connection.vendor,
+            'repeat': options['repeat'],
+            'tables': {
+                model._meta.db_table: model.objects.count()
+                for model in (Title, Review, Comments)},
+            'endpoints': {},
+        }
+        for name, url in scenarios.items():
+            report['endpoints'][name] = self.measure(
+                client, url, options['repeat'])
+        output = json.dumps(report, indent=2, sort_keys=True,
+                            ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf8') as out:
+                out.write(output)
+        else:
+            self.stdout.write(output)
+
+    def measure(self, client, url, repeat):
+        # Первый проход прогревает кэши и собирает запросы, время
+        # считается по остальным проходам без перехвата SQL.
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: статус {response.status_code}')
+        queries = [query['sql'] for query in context.captured_queries]
+        scanned = [rows_scanned(sql) for sql in queries]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'url': url,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'queries': len(queries),
+            'duplicate_queries': len(queries) - len(
+                {normalize_sql(sql) for sql in queries}),
+            'rows_scanned': (None if None in scanned else sum(scanned)),
+            'response_bytes': len(response.content),
+        }
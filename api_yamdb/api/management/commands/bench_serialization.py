@@ -0,0 +1,104 @@
+import json
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Comments, Title
+
+from ...renderers import FastJSONRenderer, orjson
+from ...serializers import (CommentSerializer, CommentValuesSerializer,
+                            ReviewSerializer, ReviewValuesSerializer,
+                            TitleSerializerGet, TitleValuesSerializer)
+
+
+def cpu_ms(function, repeat):
+    """Медиана процессорного времени вызова в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        function()
+        timings.append((time.process_time() - started) * 1000)
+    return statistics.median(timings)
+
+
+def build_cases(rows):
+    """Запросы страниц и пары сериализаторов: ModelSerializer и values()."""
+    hot_title = Title.objects.order_by('-review_count').first()
+    if hot_title is None:
+        raise CommandError('База пуста, сначала выполните generate_data')
+    return {
+        'titles': (
+            Title.objects.select_related('category')
+            .prefetch_related('genre').order_by('id')[:rows],
+            TitleSerializerGet, TitleValuesSerializer()),
+        'reviews': (
+            hot_title.review.select_related('author').order_by('id')[:rows],
+            ReviewSerializer,
+            ReviewValuesSerializer(context={'parent': hot_title})),
+        'comments': (
+            Comments.objects.select_related('author').order_by('id')[:rows],
+            CommentSerializer, CommentValuesSerializer()),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает процессорное время ModelSerializer и сериализаторов '
+            'values() на 1000 строк: от запроса до списка словарей, '
+            'и рендер этих страниц в JSON через json и FastJSONRenderer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        report = {'rows': options['rows'], 'serializers': {},
+                  'renderers': {}}
+        cases = build_cases(options['rows'])
+        for name, (queryset, model_serializer,
+                   values_serializer) in cases.items():
+            count = len(queryset.all())
+            if not count:
+                continue
+            model_ms = cpu_ms(
+                lambda: model_serializer(queryset.all(), many=True).data,
+                options['repeat'])
+            values_ms = cpu_ms(
+                lambda: values_serializer.many(
+                    values_serializer.rows(queryset.all())),
+                options['repeat'])
+            report['serializers'][name] = {
+                'rows': count,
+                'model_ms_per_1000': round(model_ms * 1000 / count, 3),
+                'values_ms_per_1000': round(values_ms * 1000 / count, 3),
+                'speedup': round(model_ms / values_ms, 2) if values_ms
+                else None,
+            }
+            report['renderers'][name] = self.bench_render(
+                {'results': values_serializer.many(
+                    values_serializer.rows(queryset.all()))},
+                options['repeat'])
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf8') as out:
+                out.write(output)
+        else:
+            self.stdout.write(output)
+
+    def bench_render(self, data, repeat):
+        """Время рендера одной страницы и пропускная способность."""
+        size = len(JSONRenderer().render(data))
+        stdlib_ms = cpu_ms(lambda: JSONRenderer().render(data), repeat)
+        fast_ms = cpu_ms(lambda: FastJSONRenderer().render(data), repeat)
+        return {
+            'backend': 'json' if orjson is None else 'orjson',
+            'bytes': size,
+            'stdlib_ms': round(stdlib_ms, 3),
+            'fast_ms': round(fast_ms, 3),
+            'stdlib_mb_per_s': round(size / stdlib_ms / 1000, 1)
+            if stdlib_ms else None,
+            'fast_mb_per_s': round(size / fast_ms / 1000, 1)
+            if fast_ms else None,
+            'speedup': round(stdlib_ms / fast_ms, 2) if fast_ms else None,
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from .bench_api import build_scenarios, percentile
+
+MODES = ('sync', 'gthread', 'uvicorn')
+DEFAULT_SCENARIOS = ('categories-list', 'titles-list', 'titles-detail',
+                     'reviews-list', 'comments-list')
+
+
+async def fetch(reader, writer, host, path):
+    """GET по открытому соединению, возвращает статус и keep-alive."""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'
+                 'Accept: application/json\r\n\r\n'.encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def client(host, port, paths, delay, deadline, results):
+    """Один клиент: запросы подряд по кругу маршрутов до deadline."""
+    await asyncio.sleep(delay)
+    connection = None
+    number = 0
+    while time.monotonic() < deadline:
+        name, path = paths[number % len(paths)]
+        number += 1
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(host, port)
+            status, keep_alive = await fetch(*connection, host, path)
+        except (OSError, ValueError, IndexError,
+                asyncio.IncompleteReadError):
+            results['errors'] += 1
+            connection = None
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        if status == 200:
+            results['timings'].setdefault(name, []).append(elapsed)
+        else:
+            results['errors'] += 1
+        if not keep_alive:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def run_load(host, port, paths, concurrency, duration):
+    results = {'errors': 0, 'timings': {}}
+    deadline = time.monotonic() + duration
+    # Клиенты подключаются в течение первой пятой части замера, чтобы
+    # не переполнить очередь приёма соединений, и начинают с разных
+    # маршрутов, чтобы нагрузка была смешанной.
+    ramp_up = min(duration / 5, 1)
+    await asyncio.gather(*(
+        client(host, port, paths[index % len(paths):]
+               + paths[:index % len(paths)],
+               ramp_up * index / concurrency, deadline, results)
+        for index in range(concurrency)))
+    return results
+
+
+def load(host, port, paths, concurrency, duration):
+    """
+    Держит concurrency одновременных соединений duration секунд и
+    возвращает пропускную способность и задержки по маршрутам.
+    """
+    started = time.monotonic()
+    results = asyncio.run(
+        run_load(host, port, paths, concurrency, duration))
+    elapsed = time.monotonic() - started
+    everything = [value for timings in results['timings'].values()
+                  for value in timings]
+    return {
+        'requests': len(everything),
+        'errors': results['errors'],
+        'rps': round(len(everything) / elapsed, 1),
+        'p50_ms': round(percentile(everything, 0.5), 3) if everything
+        else None,
+        'p95_ms': round(percentile(everything, 0.95), 3) if everything
+        else None,
+        'p99_ms': round(percentile(everything, 0.99), 3) if everything
+        else None,
+        'endpoints': {
+            name: {'requests': len(timings),
+                   'p50_ms': round(percentile(timings, 0.5), 3),
+                   'p95_ms': round(percentile(timings, 0.95), 3)}
+            for name, timings in results['timings'].items()},
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(host, port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError('Сервер завершился при запуске')
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Сервер не начал слушать {host}:{port}')
+
+
+class Command(BaseCommand):
+    help = ('Запускает gunicorn в каждой модели процессов и сравнивает '
+            'пропускную способность и задержки на одних маршрутах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=MODES,
+                            default=list(MODES))
+        parser.add_argument(
+            '--workers', type=int,
+            help='Число процессов, по умолчанию как в gunicorn.conf.py.')
+        parser.add_argument('--threads', type=int)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Длительность замера в секундах.')
+        parser.add_argument('--warmup', type=float, default=2)
+        parser.add_argument('--only', nargs='+',
+                            help='Сценарии bench_api для нагрузки.')
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        scenarios = build_scenarios()
+        names = options['only'] or [
+            name for name in DEFAULT_SCENARIOS if name in scenarios]
+        paths = [(name, quote(scenarios[name], safe='/?=&'))
+                 for name in names]
+        report = {
+            'cpus': os.cpu_count(),
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'scenarios': names,
+            'modes': {},
+        }
+        for mode in options['modes']:
+            report['modes'][mode] = self.bench_mode(mode, paths, options)
+        output = json.dumps(report, indent=2, sort_keys=True,
+                            ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf8') as out:
+                out.write(output)
+        else:
+            self.stdout.write(output)
+
+    def bench_mode(self, mode, paths, options):
+        host, port = '127.0.0.1', free_port()
+        env = dict(os.environ, GUNICORN_WORKER_CLASS=mode,
+                   GUNICORN_BIND=f'{host}:{port}')
+        for option in ('workers', 'threads'):
+            if options[option]:
+                env[f'GUNICORN_{option.upper()}'] = str(options[option])
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(host, port, process, timeout=30)
+            if options['warmup']:
+                # Прогрев небольшим числом клиентов: брошенные в конце
+                # прогрева запросы не должны попасть в замер.
+                load(host, port, paths, min(options['concurrency'], 10),
+                     options['warmup'])
+            result = load(host, port, paths, options['concurrency'],
+                          options['duration'])
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        result['workers'] = env.get('GUNICORN_WORKERS', 'auto')
+        result['threads'] = env.get('GUNICORN_THREADS', 'auto')
+        return result
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = ('Измеряет пропускную способность регистрации через '
+            '/api/v1/auth/signup/. Созданные пользователи откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500)
+
+    def handle(self, *args, **options):
+        client = Client()
+        count = options['count']
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                client.post('/api/v1/auth/signup/', data={
+                    'username': 'bench-probe',
+                    'email': 'bench-probe@yamdb.fake'})
+            # Журнал запросов очищается в начале каждого следующего запроса.
+            queries = len(context.captured_queries)
+            started = time.perf_counter()
+            for number in range(count):
+                client.post('/api/v1/auth/signup/', data={
+                    'username': f'bench-signup-{number}',
+                    'email': f'bench-signup-{number}@yamdb.fake'})
+            seconds = time.perf_counter() - started
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'{count} регистраций за {seconds:.2f} с '
+            f'({count / seconds:.0f} в секунду), '
+            f'запросов к базе на регистрацию: '
+            f'{queries}')
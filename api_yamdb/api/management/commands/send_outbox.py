@@ -0,0 +1,17 @@
+from api.mail import mail_queue
+from django.core.management import BaseCommand
+from reviews.models import MailOutbox
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма, оставшиеся в MailOutbox после сбоя процесса.'
+
+    def handle(self, *args, **options):
+        pending = list(MailOutbox.objects.filter(sent=None)
+                       .values_list('pk', flat=True))
+        # Письма, которые сейчас отправляет очередь процесса, deliver
+        # не заберёт и пропустит.
+        sent = sum(
+            mail_queue.deliver(pending[start:start + mail_queue.batch_size])
+            for start in range(0, len(pending), mail_queue.batch_size))
+        self.stdout.write(f'Отправлено писем: {sent}')
@@ -0,0 +1,406 @@
+import bisect
+import fcntl
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.views import View
+
+from .profiling import QueryRecorder
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+INITIAL_SIZE = 64 * 1024
+USED = struct.Struct('q')
+LENGTH = struct.Struct('i')
+VALUE = struct.Struct('d')
+# Счётчики завершившихся процессов, сложенные в один файл.
+ARCHIVE = 'counter_archive.db'
+
+
+def iter_entries(data, used):
+    """Ключи записей и смещения их значений."""
+    position = USED.size
+    while position < used:
+        length = LENGTH.unpack_from(data, position)[0]
+        start = position + LENGTH.size
+        end = start + length
+        offset = end + (-end % 8)
+        yield bytes(data[start:end]).decode(), offset
+        position = offset + VALUE.size
+
+
+class ValueFile:
+    """
+    Значения метрик одного процесса в файле, отображённом в память.
+    Пишет только процесс-владелец, поэтому межпроцессные блокировки
+    не нужны. В заголовке — сколько байт занято; владелец сдвигает эту
+    отметку, когда запись уже целиком на месте, и читатели из других
+    процессов видят только готовые записи. Запись: длина ключа, ключ,
+    выравнивание до 8 байт и значение double.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, 'a+b')
+        size = os.fstat(self.file.fileno()).st_size
+        if size == 0:
+            size = INITIAL_SIZE
+            self.file.truncate(size)
+        self.capacity = size
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.used = USED.unpack_from(self.map, 0)[0] or USED.size
+        self.positions = dict(iter_entries(self.map, self.used))
+
+    def add(self, key, amount):
+        with self.lock:
+            offset = self.positions.get(key) or self.append(key)
+            VALUE.pack_into(self.map, offset,
+                            VALUE.unpack_from(self.map, offset)[0] + amount)
+
+    def set(self, key, value):
+        with self.lock:
+            offset = self.positions.get(key) or self.append(key)
+            VALUE.pack_into(self.map, offset, value)
+
+    def append(self, key):
+        encoded = key.encode()
+        end = LENGTH.size + len(encoded)
+        offset = end + (-end % 8)
+        size = offset + VALUE.size
+        while self.used + size > self.capacity:
+            self.grow()
+        LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + LENGTH.size:self.used + end] = encoded
+        VALUE.pack_into(self.map, self.used + offset, 0.0)
+        self.positions[key] = offset = self.used + offset
+        self.used += size
+        USED.pack_into(self.map, 0, self.used)
+        return offset
+
+    def grow(self):
+        self.capacity *= 2
+        self.map.close()
+        self.file.truncate(self.capacity)
+        self.map = mmap.mmap(self.file.fileno(), self.capacity)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def read_values(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < USED.size:
+        return
+    used = min(USED.unpack_from(data, 0)[0], len(data))
+    for key, offset in iter_entries(data, used):
+        yield key, VALUE.unpack_from(data, offset)[0]
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def locked(directory, operation):
+    """
+    Блокировка каталога метрик: чтение берёт общую, перенос файлов
+    завершившихся процессов в архив — исключительную.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'lock'), 'a') as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Складывает счётчики завершившегося процесса в ARCHIVE и удаляет
+    его файлы, чтобы каталог не рос с каждым перезапуском процесса.
+    Вызывается из child_exit gunicorn и из Store.collect.
+    """
+    directory = directory or settings.METRICS_DIR
+    with locked(directory, fcntl.LOCK_EX):
+        gauges = os.path.join(directory, f'gauge_{pid}.db')
+        if os.path.exists(gauges):
+            os.remove(gauges)
+        counters = os.path.join(directory, f'counter_{pid}.db')
+        if not os.path.exists(counters):
+            return
+        archive = os.path.join(directory, ARCHIVE)
+        values = dict(read_values(archive)) if os.path.exists(
+            archive) else {}
+        for key, value in read_values(counters):
+            values[key] = values.get(key, 0.0) + value
+        # Архив пишется рядом и подменяется целиком.
+        temporary = archive + '.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        value_file = ValueFile(temporary)
+        for key, value in values.items():
+            value_file.set(key, value)
+        value_file.close()
+        os.replace(temporary, archive)
+        os.remove(counters)
+
+
+class Store:
+    """
+    Файлы значений процессов в METRICS_DIR: counter_{pid}.db для счётчиков
+    и гистограмм, gauge_{pid}.db для текущих значений. После fork процесс
+    заводит свои файлы. Счётчики при чтении складываются по всем файлам;
+    файлы завершившихся процессов сначала переносятся в ARCHIVE. Текущие
+    значения учитываются только у живых процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}
+
+    def file(self, kind):
+        key = (kind, os.getpid(), settings.METRICS_DIR)
+        value_file = self.files.get(key)
+        if value_file is None:
+            with self.lock:
+                value_file = self.files.get(key)
+                if value_file is None:
+                    os.makedirs(key[2], exist_ok=True)
+                    value_file = self.files[key] = ValueFile(os.path.join(
+                        key[2], f'{kind}_{key[1]}.db'))
+        return value_file
+
+    def paths(self):
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+            kind, pid = os.path.basename(path)[:-3].split('_')
+            yield path, kind, pid
+
+    def collect(self):
+        for _, _, pid in self.paths():
+            if pid != 'archive' and not alive(int(pid)):
+                mark_process_dead(pid)
+        values = {}
+        with locked(settings.METRICS_DIR, fcntl.LOCK_SH):
+            for path, _, _ in self.paths():
+                for key, value in read_values(path):
+                    values[key] = values.get(key, 0.0) + value
+        return values
+
+
+store = Store()
+REGISTRY = []
+
+
+def escape(value):
+    return (str(value).replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def sample(name, labelnames, labels, value):
+    if labelnames:
+        name += '{%s}' % ','.join(
+            f'{label}="{escape(label_value)}"'
+            for label, label_value in zip(labelnames, labels))
+    return f'{name} {float(value)!r}'
+
+
+class Metric:
+    type = None
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.keys = {}
+        REGISTRY.append(self)
+
+    def key(self, suffix, labels):
+        values = tuple(labels[name] for name in self.labelnames)
+        key = self.keys.get((suffix, values))
+        if key is None:
+            key = self.keys[suffix, values] = json.dumps(
+                [self.name, suffix, values], ensure_ascii=False)
+        return key
+
+    def write(self, method, suffix, labels, value):
+        if settings.METRICS_ENABLED:
+            getattr(store.file(self.kind), method)(
+                self.key(suffix, labels), value)
+
+    def samples(self, values):
+        if not values and not self.labelnames:
+            values = {('', ()): 0.0}
+        for (suffix, labels), value in sorted(values.items()):
+            yield sample(self.name + suffix, self.labelnames, labels, value)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.write('add', '', labels, amount)
+
+
+class Gauge(Metric):
+    """Текущее значение; при function оно вычисляется при выгрузке."""
+    type = 'gauge'
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        self.write('set', '', labels, value)
+
+    def samples(self, values):
+        if self.function is not None:
+            values = {('', ()): self.function()}
+        return super().samples(values)
+
+
+class Histogram(Metric):
+    """
+    Корзины хранятся без накопления (одна запись на наблюдение),
+    накопленные суммы считаются при выгрузке.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self.bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        counters = store.file(self.kind)
+        counters.add(self.key('_bucket:' + self.bounds[index], labels), 1)
+        counters.add(self.key('_sum', labels), value)
+
+    def samples(self, values):
+        series = {}
+        for (suffix, labels), value in values.items():
+            series.setdefault(labels, {})[suffix] = value
+        labelnames = self.labelnames + ('le',)
+        for labels, parts in sorted(series.items()):
+            total = 0.0
+            for bound in self.bounds:
+                total += parts.get('_bucket:' + bound, 0.0)
+                yield sample(self.name + '_bucket', labelnames,
+                             labels + (bound,), total)
+            yield sample(self.name + '_sum', self.labelnames, labels,
+                         parts.get('_sum', 0.0))
+            yield sample(self.name + '_count', self.labelnames, labels,
+                         total)
+
+
+def exposition():
+    """Все метрики всех процессов в текстовом формате Prometheus."""
+    grouped = {}
+    for key, value in store.collect().items():
+        name, suffix, labels = json.loads(key)
+        grouped.setdefault(name, {})[suffix, tuple(labels)] = value
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(metric.samples(grouped.get(metric.name, {})))
+    return '\n'.join(lines) + '\n'
+
+
+def outbox_pending():
+    from reviews.models import MailOutbox
+
+    return MailOutbox.objects.filter(sent=None).count()
+
+
+SECONDS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+SHORT_SECONDS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+
+REQUESTS = Counter(
+    'yamdb_http_requests_total', 'Обработанные запросы.',
+    ('route', 'method', 'status'))
+REQUEST_SECONDS = Histogram(
+    'yamdb_http_request_duration_seconds', 'Время обработки запроса.',
+    ('route', 'method'), SECONDS)
+DB_QUERIES = Histogram(
+    'yamdb_db_queries_per_request', 'SQL-запросов на запрос.',
+    ('route',), (0, 1, 2, 3, 5, 10, 20, 50, 100))
+DB_SECONDS = Histogram(
+    'yamdb_db_duration_seconds', 'Время в базе на запрос.',
+    ('route',), SHORT_SECONDS)
+AUTH_SECONDS = Histogram(
+    'yamdb_auth_duration_seconds', 'Время проверки JWT.',
+    buckets=SHORT_SECONDS)
+RENDER_SECONDS = Histogram(
+    'yamdb_render_duration_seconds', 'Время рендера ответа в JSON.',
+    buckets=SHORT_SECONDS)
+CACHE_HITS = Counter(
+    'yamdb_cache_hits_total', 'Ответы из кэша.')
+CACHE_MISSES = Counter(
+    'yamdb_cache_misses_total', 'Промахи кэша ответов.')
+MAIL_QUEUE_DEPTH = Gauge(
+    'yamdb_mail_queue_depth', 'Письма в очередях процессов.')
+MAIL_OUTBOX_PENDING = Gauge(
+    'yamdb_mail_outbox_pending', 'Неотправленные письма в MailOutbox.',
+    function=outbox_pending)
+
+
+def route_name(request):
+    """basename маршрута v1_router, для прочих путей — имя URL."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    initkwargs = getattr(match.func, 'initkwargs', None) or {}
+    return initkwargs.get('basename') or match.url_name or 'unresolved'
+
+
+class MetricsMiddleware:
+    """
+    Время запросов, число и время SQL-запросов по маршрутам.
+    Выключается METRICS_ENABLED=false.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+        route = route_name(request)
+        # Метод приходит от клиента: прочие значения не плодят серии.
+        method = (request.method
+                  if request.method.lower() in View.http_method_names
+                  else 'other')
+        REQUESTS.inc(route=route, method=method, status=response.status_code)
+        REQUEST_SECONDS.observe(seconds, route=route, method=method)
+        DB_QUERIES.observe(recorder.count, route=route)
+        DB_SECONDS.observe(recorder.seconds, route=route)
+        return response
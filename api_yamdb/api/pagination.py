@@ -0,0 +1,172 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Постраничный вывод по ключу: следующая страница выбирается условием
+    по значениям полей сортировки последней строки, а не смещением.
+    Глубокие страницы стоят столько же, сколько первая, COUNT не выполняется.
+    Поля ключа берутся из атрибута представления cursor_ordering и должны
+    однозначно упорядочивать строки (последним полем идёт id).
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = tuple(view.cursor_ordering)
+        values, reverse = self.decode_cursor(request)
+        if values is not None:
+            values = self.cursor_values(queryset, values)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, values))
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        page = rows[:self.limit]
+        if reverse:
+            page.reverse()
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = values is not None if not reverse else has_more
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        values = [self._value(obj, field) for field in self.ordering]
+        payload = json.dumps({'v': values, 'r': int(reverse)},
+                             separators=(',', ':'), default=str)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def cursor_values(self, queryset, values):
+        """
+        Значения курсора в типах полей сортировки: курсор приходит
+        от клиента, и подделанное значение должно давать 404, а не 500.
+        """
+        converted = []
+        for field, value in zip(self.ordering, values):
+            model_field = self._field(queryset, field.lstrip('-'))
+            try:
+                value = model_field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None and not model_field.null:
+                raise NotFound(self.invalid_cursor_message)
+            converted.append(value)
+        return converted
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        """
+        Условие «строго после (v1, v2, ...)» в порядке сортировки.
+        Внешнее нестрогое сравнение по первому полю даёт индексу диапазон.
+        """
+        condition = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            if value is None:
+                # NULL не сравнивается: строки с NULL отделяет от прочих
+                # предыдущее поле ключа, среди них сравнивается следующее.
+                strict = Q(pk__in=[])
+            else:
+                strict = Q(**{f'{name}__{lookup}': value})
+            condition = strict if condition is None else (
+                strict | (Q(**{name: value}) & condition))
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+
+    @staticmethod
+    def _field(queryset, name):
+        # Поле ключа — поле модели или аннотация запроса (релевантность).
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _value(obj, field):
+        # Строки страницы — объекты моделей или словари values().
+        name = field.lstrip('-')
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """
+    Обычный limit/offset, а с параметром ?cursor= — постраничный вывод
+    по ключу (KeysetPagination). Пустой ?cursor= открывает первую страницу.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (self.keyset_class.cursor_query_param in request.query_params
+                and getattr(view, 'cursor_ordering', None)):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
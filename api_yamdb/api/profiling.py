@@ -0,0 +1,166 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    Обёртка execute_wrapper: время и шаблоны SQL-запросов одного запроса.
+    Шаблоны приходят без подставленных параметров, поэтому повторы
+    одного шаблона — это запросы N+1.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.templates = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.templates.add(sql)
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.templates)
+
+
+class ProfileStats:
+    """Сводка по маршрутам и методам за время жизни процесса."""
+
+    fields = ('requests', 'wall_ms', 'db_ms', 'queries',
+              'duplicate_queries', 'response_bytes')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.profiles = []
+            self.started = time.time()
+
+    def record(self, key, wall_ms, db_ms, queries, duplicates, size):
+        with self.lock:
+            route = self.routes.get(key)
+            if route is None:
+                route = self.routes[key] = dict.fromkeys(self.fields, 0)
+                route['max_wall_ms'] = 0.0
+            route['requests'] += 1
+            route['wall_ms'] += wall_ms
+            route['db_ms'] += db_ms
+            route['queries'] += queries
+            route['duplicate_queries'] += duplicates
+            route['response_bytes'] += size
+            route['max_wall_ms'] = max(route['max_wall_ms'], wall_ms)
+
+    def keep_profile(self, key, wall_ms, profile, limit):
+        """Оставляет limit самых медленных профилей."""
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats(
+            'cumulative').print_stats(25)
+        with self.lock:
+            self.profiles.append(
+                {'route': key, 'wall_ms': round(wall_ms, 3),
+                 'at': time.time(), 'stats': out.getvalue()})
+            self.profiles.sort(key=lambda item: -item['wall_ms'])
+            del self.profiles[limit:]
+
+    def as_dict(self):
+        with self.lock:
+            routes = {}
+            for key, route in self.routes.items():
+                count = route['requests']
+                routes[key] = {
+                    'requests': count,
+                    'mean_wall_ms': round(route['wall_ms'] / count, 3),
+                    'max_wall_ms': round(route['max_wall_ms'], 3),
+                    'mean_db_ms': round(route['db_ms'] / count, 3),
+                    'mean_queries': round(route['queries'] / count, 2),
+                    'duplicate_queries': route['duplicate_queries'],
+                    'mean_response_bytes': round(
+                        route['response_bytes'] / count),
+                }
+            return {
+                'pid': os.getpid(),
+                'since': self.started,
+                'routes': routes,
+                'slow_profiles': list(self.profiles),
+            }
+
+
+stats = ProfileStats()
+
+
+class ProfilingMiddleware:
+    """
+    Время, SQL-запросы и размер ответа по маршрутам (view_name и метод).
+    Включается PROFILING_ENABLED, иначе Django не ставит её в цепочку.
+    С PROFILING_SAMPLE_RATE доля запросов выполняется под cProfile,
+    и профили запросов дольше PROFILING_SLOW_MS сохраняются в сводке.
+    Раз в PROFILING_DUMP_INTERVAL секунд сводка пишется в журнал
+    и в PROFILING_DUMP_PATH, если он задан.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_ms = settings.PROFILING_SLOW_MS
+        self.keep_profiles = settings.PROFILING_KEEP_PROFILES
+        self.dump_interval = settings.PROFILING_DUMP_INTERVAL
+        self.dump_path = settings.PROFILING_DUMP_PATH
+        self.next_dump = time.monotonic() + self.dump_interval
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        profile = (cProfile.Profile()
+                   if self.sample_rate and random.random() < self.sample_rate
+                   else None)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if profile is not None:
+                response = profile.runcall(self.get_response, request)
+            else:
+                response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        key = f'{request.method} {match.view_name if match else "unresolved"}'
+        size = 0 if response.streaming else len(response.content)
+        stats.record(key, wall_ms, recorder.seconds * 1000, recorder.count,
+                     recorder.duplicates, size)
+        if profile is not None and wall_ms >= self.slow_ms:
+            stats.keep_profile(key, wall_ms, profile, self.keep_profiles)
+        if self.dump_interval and time.monotonic() >= self.next_dump:
+            self.next_dump = time.monotonic() + self.dump_interval
+            self.dump()
+        return response
+
+    def dump(self):
+        report = json.dumps(stats.as_dict(), sort_keys=True)
+        logger.info('Профиль маршрутов: %s', report)
+        if self.dump_path:
+            path = self.dump_path.format(pid=os.getpid())
+            with open(path, 'w', encoding='utf8') as out:
+                out.write(report)
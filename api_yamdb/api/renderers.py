@@ -0,0 +1,50 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson, если он установлен. Байты ответа те же:
+    даты и всё, чего orjson не знает, кодирует encoder_class DRF,
+    U+2028/U+2029 экранируются. С отступом (браузерный API, indent=
+    в Accept) и при нестандартных UNICODE_JSON/COMPACT_JSON работает
+    обычный JSONRenderer. NaN и бесконечность orjson пишет как null,
+    а не отказывает, как json при STRICT_JSON.
+    """
+    options = 0 if orjson is None else (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return self.encode(data, accepted_media_type, renderer_context)
+        finally:
+            metrics.RENDER_SECONDS.observe(time.perf_counter() - started)
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=self.options)
+        except orjson.JSONEncodeError:
+            # Например, целые больше 64 бит: их умеет только json.
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = (ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+                   .replace(b'\xe2\x80\xa9', b'\\u2029'))
+        return ret
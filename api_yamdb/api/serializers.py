@@ -1,9 +1,13 @@
 import datetime
 import re
 
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.encoding import smart_str
 from rest_framework import serializers
-from reviews.models import Category, Comments, Genre, Review, Title, User
+from rest_framework.settings import api_settings
+from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
+                            Title, User)
 
 from .utils import GenreCategorySerializer
 
@@ -55,13 +59,32 @@ class GenreSerializer(GenreCategorySerializer):
         model = Genre
 
 
+class BatchSlugRelatedField(serializers.SlugRelatedField):
+    """
+    В пакетных запросах берёт объекты из context['related'], собранного
+    одним запросом на весь пакет (api.bulk.related_by_slug).
+    """
+
+    def to_internal_value(self, data):
+        related = self.context.get('related')
+        if related is None:
+            return super().to_internal_value(data)
+        try:
+            return related[self.get_queryset().model][data]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=smart_str(data))
+        except TypeError:
+            self.fail('invalid')
+
+
 class TitleSerializer(serializers.ModelSerializer):
     """Класс сериализатор произведения"""
     name = serializers.CharField(max_length=256)
-    category = serializers.SlugRelatedField(
+    category = BatchSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug')
-    genre = serializers.SlugRelatedField(
+    genre = BatchSlugRelatedField(
         queryset=Genre.objects.all(),
         many=True,
         slug_field='slug')
@@ -90,6 +113,75 @@ class TitleSerializerGet(serializers.ModelSerializer):
         model = Title
 
 
+class ValuesSerializer:
+    """
+    Сериализатор списков только для чтения: словари ответа строятся
+    прямо из строк values(), без экземпляров моделей и полей DRF.
+    JSON совпадает с ответом соответствующего ModelSerializer.
+    fields — ключи ответа и поля values(), из которых они берутся;
+    values — поля, которые читаются, по умолчанию поля из fields.
+    """
+    fields = {}
+    values = ()
+    datetime_fields = ()
+    datetime_field = serializers.DateTimeField(read_only=True)
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def rows(self, queryset):
+        # Аннотации (например, релевантность поиска) нужны для курсора.
+        return queryset.prefetch_related(None).values(
+            *(self.values or self.fields.values()),
+            *queryset.query.annotations)
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+    def to_representation(self, row):
+        data = {key: row[field] for key, field in self.fields.items()}
+        for key in self.datetime_fields:
+            data[key] = self.datetime(data[key])
+        return data
+
+    def datetime(self, value):
+        return self.datetime_field.to_representation(value)
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """
+    То же, что TitleSerializerGet. Жанры страницы читаются одним
+    запросом в порядке добавления, как их отдаёт prefetch_related.
+    """
+    fields = {'id': 'id', 'name': 'name', 'year': 'year',
+              'rating': 'rating', 'description': 'description'}
+    values = (*fields.values(),
+              'category_id', 'category__name', 'category__slug')
+
+    def many(self, rows):
+        rows = list(rows)
+        genres = {}
+        links = (GenreTitle.objects
+                 .filter(title__in=[row['id'] for row in rows],
+                         genre__isnull=False)
+                 .order_by('title', 'pk')
+                 .values_list('title', 'genre__name', 'genre__slug'))
+        for title_id, name, slug in links:
+            genres.setdefault(title_id, []).append(
+                {'name': name, 'slug': slug})
+        return [self.to_representation(row, genres.get(row['id'], []))
+                for row in rows]
+
+    def to_representation(self, row, genres=()):
+        data = super().to_representation(row)
+        data['genre'] = list(genres)
+        data['category'] = None if row['category_id'] is None else {
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+        }
+        return data
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор модели User."""
     title = serializers.SlugRelatedField(
@@ -101,17 +193,6 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    def validate(self, data):
-        """Валидация для отзыва."""
-        request = self.context['request']
-        title_id = self.context['view'].kwargs.get('title_id')
-        if request.method == 'POST' and Review.objects.filter(
-                title=get_object_or_404(Title, id=title_id),
-                author=request.user).exists():
-            raise serializers.ValidationError(
-                'Пользователь может оставить только один отзыв.')
-        return data
-
     class Meta:
         fields = '__all__'
         model = Review
@@ -130,6 +211,28 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('review',)
 
 
+class ReviewValuesSerializer(ValuesSerializer):
+    """
+    То же, что ReviewSerializer, для отзывов одного произведения:
+    название берётся у произведения из context['parent'].
+    """
+    fields = {'id': 'id', 'author': 'author__username', 'text': 'text',
+              'score': 'score', 'pub_date': 'pub_date'}
+    datetime_fields = ('pub_date',)
+
+    def to_representation(self, row):
+        data = super().to_representation(row)
+        return {'id': data.pop('id'),
+                'title': self.context['parent'].name, **data}
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """То же, что CommentSerializer."""
+    fields = {'id': 'id', 'text': 'text', 'pub_date': 'pub_date',
+              'author': 'author__username', 'review': 'review'}
+    datetime_fields = ('pub_date',)
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     username = serializers.CharField(max_length=150)
     email = serializers.EmailField(max_length=254)
@@ -147,19 +250,43 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
-        """Валидация пользователей."""
+        """Валидация пользователей одним запросом к базе."""
         username = data['username']
         email = data['email']
-        if User.objects.filter(username=username, email=email).exists():
+        users = list(User.objects.filter(
+            Q(username=username) | Q(email=email))[:2])
+        self.existing_user = next(
+            (user for user in users
+             if user.username == username and user.email == email), None)
+        if self.existing_user is not None:
             return data
-        elif User.objects.filter(username=username).exists():
+        if any(user.username == username for user in users):
             raise serializers.ValidationError(
                 'Пользователь с таким именем уже существует')
-        elif User.objects.filter(email=email).exists():
+        if users:
             raise serializers.ValidationError(
                 'Такой email уже используется')
         return data
 
+    def create(self, validated_data):
+        """
+        Новый пользователь создаётся без предварительных проверок:
+        одновременные регистрации разводят уникальные индексы username/email.
+        """
+        if self.existing_user is not None:
+            return self.existing_user
+        try:
+            with transaction.atomic():
+                return User.objects.create(**validated_data)
+        except IntegrityError:
+            # Параллельный запрос мог зарегистрировать ту же пару.
+            user = User.objects.filter(**validated_data).first()
+            if user is not None:
+                return user
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Пользователь с таким именем или email уже существует']})
+
 
 class TokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField()
@@ -0,0 +1,91 @@
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
+                            Title, User)
+
+from . import cache, connections
+from .authentication import forget_user
+
+# Какие пространства кэша зависят от изменений каждой модели.
+INVALIDATES = {
+    Category: ('categories', 'titles'),
+    Genre: ('genres', 'titles'),
+    Title: ('titles',),
+    GenreTitle: ('titles',),
+    Review: ('titles',),
+}
+
+
+def instance_namespaces(sender, instance):
+    """Пространства списков отзывов и комментариев, где выводится объект."""
+    if sender is Review:
+        title_ids = {instance.title_id,
+                     getattr(instance, '_loaded_title_id', None)} - {None}
+        return tuple(f'reviews:{title_id}' for title_id in title_ids)
+    if sender is Comments:
+        return (f'comments:{instance.review_id}',)
+    return ()
+
+
+def own_namespaces(sender, instance):
+    """Пространства списков, родитель которых — сам объект."""
+    if sender is Title:
+        # Название произведения выводится в каждом отзыве.
+        return (f'reviews:{instance.pk}',)
+    if sender is Review:
+        return (f'comments:{instance.pk}',)
+    return ()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def catalogue_changed(sender, instance, created=False, **kwargs):
+    own = own_namespaces(sender, instance)
+    if kwargs['signal'] is post_delete:
+        # Списки удалённого родителя отвечают 404 до чтения версий,
+        # строки их версий больше не нужны.
+        if own:
+            cache.forget(*own)
+        own = ()
+    elif created:
+        # Списков нового объекта ещё никто не читал.
+        own = ()
+    namespaces = (*INVALIDATES.get(sender, ()),
+                  *instance_namespaces(sender, instance), *own)
+    if namespaces:
+        cache.bump(*namespaces)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        cache.bump(*INVALIDATES[GenreTitle])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, **kwargs):
+    forget_user(instance.pk)
+    if (not created and kwargs['signal'] is post_save
+            and getattr(instance, '_loaded_username', None)
+            != instance.username):
+        # Имя автора выводится в отзывах и комментариях.
+        cache.bump('authors')
+    instance._loaded_username = instance.username
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    connections.check_connections()
+
+
+@receiver(request_finished)
+def request_served(sender, **kwargs):
+    connections.stats.request_served()
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    connections.stats.connection_opened(connection)
@@ -24,5 +24,9 @@ v1_router.register(
 urlpatterns = [
     path('v1/auth/signup/', views.user_registration, name='user_registration'),
     path('v1/auth/token/', views.get_tokens_for_user, name='get_token'),
+    path('v1/cache/stats/', views.cache_stats, name='cache_stats'),
+    path('v1/db/stats/', views.db_stats, name='db_stats'),
+    path('v1/profiling/stats/', views.profiling_stats,
+         name='profiling_stats'),
     path('v1/', include(v1_router.urls)),
 ]
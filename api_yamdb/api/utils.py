@@ -1,45 +1,131 @@
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers, viewsets
+from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
 from rest_framework.viewsets import GenericViewSet
 from reviews.models import Review, Title
 
+from . import bulk
+from .cache import CachedResponseMixin, ConditionalGetMixin
+from .pagination import LimitOffsetOrCursorPagination
 from .permissions import IsAdminModeratorAuthorOrReadOnly, IsAdminOrReadOnly
 
 
-class ReviewComment(viewsets.ModelViewSet):
+class ValuesListMixin:
+    """
+    Список без ModelSerializer: страница читается через values(),
+    словари ответа строит values_serializer_class.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.values_serializer_class(
+            context=self.get_serializer_context())
+        queryset = serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
+
+
+class ReviewComment(ConditionalGetMixin, ValuesListMixin,
+                    viewsets.ModelViewSet):
     permission_classes = (IsAdminModeratorAuthorOrReadOnly,)
+    pagination_class = LimitOffsetOrCursorPagination
     _model = None
     _id = None
+    _namespace = None
+
+    def get_version_namespaces(self):
+        # В отзывах и комментариях выводятся имена авторов.
+        return (f'{self._namespace}:{self.kwargs.get(self._id)}', 'authors')
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        # Без родителя ответ — 404, а не 304 по версиям пространства.
+        self.get_parent()
+        return super().conditional_response(handler, request,
+                                            *args, **kwargs)
+
+    def get_parent(self):
+        """
+        Родитель из адреса: произведение отзывов или отзыв комментариев.
+        Отзыв выбирается вместе с произведением и только среди отзывов
+        произведения из адреса. Загружается один раз за запрос.
+        """
+        if not hasattr(self, '_parent'):
+            queryset = self._model.objects.all()
+            if self._model == Review:
+                queryset = queryset.select_related('title').filter(
+                    title_id=self.kwargs.get('title_id'))
+            self._parent = get_object_or_404(
+                queryset, id=self.kwargs.get(self._id))
+        return self._parent
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self._id in self.kwargs:
+            context['parent'] = self.get_parent()
+        return context
 
     def get_queryset(self):
-        obj_id = self.kwargs.get(self._id)
-        obj = get_object_or_404(self._model, id=obj_id)
+        obj = self.get_parent()
+        # Имена авторов приходят в том же запросе, что и страница;
+        # родителя менеджер связи подставляет сам.
         if self._model == Review:
-            new_queryset = obj.comments.all()
+            new_queryset = obj.comments.select_related('author')
             return new_queryset
         elif self._model == Title:
-            new_queryset = obj.review.all()
+            new_queryset = obj.review.select_related('author')
             return new_queryset
 
     def perform_create(self, serializer):
-        obj_id = self.kwargs.get(self._id)
+        parent = self.get_parent()
         if self._model == Review:
-            review = get_object_or_404(self._model, id=obj_id)
-            serializer.save(author=self.request.user, review=review)
+            serializer.save(author=self.request.user, review=parent)
         elif self._model == Title:
-            title = get_object_or_404(self._model, id=obj_id)
-            serializer.save(author=self.request.user, title=title)
+            # Повторный отзыв отсекает ограничение unique review.
+            try:
+                with transaction.atomic():
+                    serializer.save(author=self.request.user, title=parent)
+            except IntegrityError:
+                # Прочие нарушения целостности — не ошибка клиента.
+                if not Review.objects.filter(
+                        author=self.request.user, title=parent).exists():
+                    raise
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Пользователь может оставить только один отзыв.']})
 
 
-class CategoryGenre(CreateModelMixin, ListModelMixin,
+class CategoryGenre(CachedResponseMixin, CreateModelMixin, ListModelMixin,
                     DestroyModelMixin, GenericViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    cache_query_params = ('search', 'limit', 'offset')
+
+    @action(detail=False, url_path='facets')
+    def facets(self, request):
+        """
+        Число произведений в каждой группе из счётчика title_count,
+        без обращения к таблице произведений.
+        """
+        return Response(self.get_queryset().order_by('-title_count', 'slug')
+                        .values('name', 'slug', 'title_count'))
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Создание пакета: список объектов в теле запроса."""
+        return bulk.bulk_response(bulk.create_groups(
+            self.get_serializer_class(), bulk.batch_items(request),
+            self.get_serializer_context()))
 
 
 class GenreCategorySerializer(serializers.ModelSerializer):
@@ -48,3 +134,18 @@ class GenreCategorySerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('name', 'slug')
         lookup_field = 'slug'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'taken_slugs' in self.context:
+            # Пакетная запись проверяет slug по множеству занятых,
+            # собранному одним запросом (api.bulk.create_groups).
+            fields['slug'].validators = [
+                validator for validator in fields['slug'].validators
+                if not isinstance(validator, UniqueValidator)]
+        return fields
+
+    def validate_slug(self, value):
+        if value in self.context.get('taken_slugs', ()):
+            raise serializers.ValidationError('Такой slug уже существует.')
+        return value
@@ -1,23 +1,33 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import (RATING_ORDERINGS, Category, Genre, Review, Title,
+                            TitleScore, User)
 
+from . import bulk, connections, metrics, profiling
+from .cache import CachedDetailMixin, ConditionalGetMixin, stats
+from .mail import mail_queue
+from .pagination import LimitOffsetOrCursorPagination
 from .permissions import IsAdminOnly, IsAdminOrReadOnly
 from .serializers import (CategorySerializer, CommentSerializer,
-                          ForUserSerializer, GenreSerializer, ReviewSerializer,
-                          TitleSerializer, TitleSerializerGet, TokenSerializer,
-                          UserRegistrationSerializer, UserSerializer)
-from .utils import CategoryGenre, ReviewComment
+                          CommentValuesSerializer, ForUserSerializer,
+                          GenreSerializer, ReviewSerializer,
+                          ReviewValuesSerializer, TitleSerializer,
+                          TitleSerializerGet, TitleValuesSerializer,
+                          TokenSerializer, UserRegistrationSerializer,
+                          UserSerializer)
+from .utils import CategoryGenre, ReviewComment, ValuesListMixin
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -39,15 +49,21 @@ class UsersViewSet(viewsets.ModelViewSet):
         url_name='current_user_info')
     def get_current_user_info(self, request, ):
         """Просмотр и редактирование своего аккаунта."""
+        # request.user из кэша несёт только поля для проверки прав,
+        # поэтому строка читается из базы, а при записи — под блокировкой.
         if request.method == 'GET':
-            serializer = ForUserSerializer(request.user)
+            user = get_object_or_404(User, pk=request.user.pk)
+            serializer = ForUserSerializer(user)
             return Response(serializer.data)
-        serializer = ForUserSerializer(
-            request.user, data=request.data, partial=True,
-        )
-        if serializer.is_valid():
-            serializer.save(role=request.user.role)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        with transaction.atomic():
+            user = get_object_or_404(User.objects.select_for_update(),
+                                     pk=request.user.pk)
+            serializer = ForUserSerializer(
+                user, data=request.data, partial=True,
+            )
+            if serializer.is_valid():
+                serializer.save(role=user.role)
+                return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -55,6 +71,7 @@ class CategoryViewSet(CategoryGenre):
     """ Получить список всех категорий. Права доступа: Доступно без токена"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_namespaces = ('categories',)
 
 
 class GenreViewSet(CategoryGenre):
@@ -63,13 +80,44 @@ class GenreViewSet(CategoryGenre):
     """
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_namespaces = ('genres',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+def rating_param(query_params, name):
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        value = None
+    if value is None or not 0 <= value <= 10:
+        raise ValidationError({name: ['Ожидается целое число от 0 до 10.']})
+    return value
+
+
+class TitleViewSet(ConditionalGetMixin, CachedDetailMixin, ValuesListMixin,
+                   viewsets.ModelViewSet):
     serializer_class = TitleSerializerGet
+    values_serializer_class = TitleValuesSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_field = ('genre', 'category')
+    pagination_class = LimitOffsetOrCursorPagination
+    cache_namespaces = ('titles',)
+    cache_query_params = ('genre', 'category', 'year', 'name', 'search',
+                          'q', 'ordering', 'min_rating', 'max_rating',
+                          'limit', 'offset', 'cursor')
+
+    @property
+    def cursor_ordering(self):
+        ordering = self.request.query_params.get('ordering')
+        if ordering in RATING_ORDERINGS:
+            return RATING_ORDERINGS[ordering]
+        # Результаты поиска идут по убыванию релевантности.
+        if self.request.query_params.get('search'):
+            return ('-relevance', 'id')
+        return ('id',)
 
     def get_serializer_class(self):
         if self.request.method in ('GET', 'HEAD', 'OPTIONS'):
@@ -77,11 +125,16 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleSerializer
 
     def get_queryset(self):
-        queryset = Title.objects.annotate(rating=Avg('review__score'))
+        queryset = (Title.objects
+                    .select_related('category')
+                    .prefetch_related('genre'))
         genre = self.request.query_params.get('genre')
         category = self.request.query_params.get('category')
         year = self.request.query_params.get('year')
         name = self.request.query_params.get('name')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.search(search)
         if genre:
             queryset = queryset.filter(genre__slug=genre)
         if category:
@@ -90,22 +143,84 @@ class TitleViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(year=year)
         if name:
             queryset = queryset.filter(name=name)
+        min_rating = rating_param(self.request.query_params, 'min_rating')
+        if min_rating is not None:
+            queryset = queryset.filter(rating__gte=min_rating)
+        max_rating = rating_param(self.request.query_params, 'max_rating')
+        if max_rating is not None:
+            queryset = queryset.filter(rating__lte=max_rating)
+        ordering = self.request.query_params.get('ordering')
+        if ordering:
+            if ordering not in RATING_ORDERINGS:
+                raise ValidationError({'ordering': [
+                    'Допустимые значения: rating, -rating.']})
+            queryset = queryset.order_by_rating(ordering)
         return queryset
 
+    @action(detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """Подсказки названий по началу запроса ?q=."""
+        return self.cached_response(
+            lambda request: Response(Title.objects.autocomplete(
+                request.query_params.get('q', ''))),
+            request)
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Пакет произведений: POST создаёт, PATCH меняет по id.
+        Ответ — результат для каждого элемента по порядку.
+        """
+        items = bulk.batch_items(request)
+        write = (bulk.create_titles if request.method == 'POST'
+                 else bulk.update_titles)
+        return bulk.bulk_response(write(
+            self.get_serializer_class(), items,
+            self.get_serializer_context()))
+
+    @action(detail=True, url_path='scores')
+    def scores(self, request, pk=None):
+        """Число отзывов и распределение оценок от 1 до 10."""
+        title = get_object_or_404(
+            Title.objects.only('id', 'review_count'), pk=pk)
+        counts = dict.fromkeys(range(1, 11), 0)
+        counts.update(TitleScore.objects.filter(title=title)
+                      .values_list('score', 'count'))
+        return Response({
+            'id': title.id,
+            'review_count': title.review_count,
+            'scores': {str(score): count
+                       for score, count in counts.items()},
+        })
+
 
 class CommentViewSet(ReviewComment):
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
+    cursor_ordering = ('pub_date', 'id')
 
     _model = Review
     _id = 'review_id'
+    _namespace = 'comments'
 
 
 class ReviewViewSet(ReviewComment):
     """Просмотр и редактирование рецензий."""
     serializer_class = ReviewSerializer
+    values_serializer_class = ReviewValuesSerializer
+    cursor_ordering = ('-pub_date', '-id')
 
     _model = Title
     _id = 'title_id'
+    _namespace = 'reviews'
+
+    @action(detail=False, methods=['post'], url_path='bulk',
+            permission_classes=(IsAdminOnly,))
+    def bulk(self, request, title_id=None):
+        """Пакет отзывов от имени авторов из поля author (администратор)."""
+        return bulk.bulk_response(bulk.create_reviews(
+            self.get_serializer_class(), self.get_parent(),
+            bulk.batch_items(request), self.get_serializer_context()))
 
 
 @api_view(['POST'])
@@ -113,14 +228,10 @@ class ReviewViewSet(ReviewComment):
 def user_registration(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        username = serializer.validated_data.get('username')
-        email = serializer.validated_data.get('email')
-        user, created = User.objects.get_or_create(username=username,
-                                                   email=email)
+        user = serializer.save()
         confirmation_code = default_token_generator.make_token(user)
-        send_mail('код подтверждения', confirmation_code,
-                  None, [serializer.validated_data['email']],
-                  fail_silently=False, )
+        mail_queue.send_mail('код подтверждения', confirmation_code,
+                             [serializer.validated_data['email']])
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -139,3 +250,40 @@ def get_tokens_for_user(request):
             return Response({'token': str(token.access_token)},
                             status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOnly])
+def cache_stats(request):
+    """Статистика кэша ответов процесса. Права доступа: Администратор"""
+    return Response(stats.as_dict())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOnly])
+def db_stats(request):
+    """Соединения с базой и запросы процесса. Права доступа: Администратор"""
+    return Response(connections.stats.as_dict())
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminOnly])
+def profiling_stats(request):
+    """
+    Время, SQL-запросы и размер ответов по маршрутам процесса,
+    DELETE обнуляет сводку. Права доступа: Администратор
+    """
+    if request.method == 'DELETE':
+        profiling.stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(profiling.stats.as_dict())
+
+
+@require_GET
+def metrics_exposition(request):
+    """
+    Метрики всех процессов gunicorn в текстовом формате Prometheus.
+    Снаружи закрыта в nginx, опрашивается напрямую по порту приложения.
+    """
+    return HttpResponse(metrics.exposition(),
+                        content_type=metrics.CONTENT_TYPE)
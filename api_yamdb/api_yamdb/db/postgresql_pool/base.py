@@ -0,0 +1,99 @@
+"""
+PostgreSQL с пулом соединений внутри процесса.
+
+ENGINE = 'api_yamdb.db.postgresql_pool'. Закрытие соединения Django
+возвращает его в пул, а не рвёт TCP-сессию, поэтому потоки и асинхронные
+обработчики одного процесса делят не больше POOL_MAX_SIZE соединений.
+Если все заняты, запрос ждёт POOL_TIMEOUT секунд и получает
+OperationalError.
+"""
+import os
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from psycopg2 import pool as psycopg2_pool
+
+Database = base.Database
+
+
+class ConnectionPool(psycopg2_pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool, который ждёт свободного соединения."""
+
+    def __init__(self, min_size, max_size, timeout, conn_params):
+        self.opened = 0
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_size)
+        super().__init__(min_size, max_size, **conn_params)
+        # putconn оставляет открытыми не больше minconn свободных
+        # соединений, а пул бережёт все уже открытые.
+        self.minconn = max_size
+
+    def _connect(self, key=None):
+        self.opened += 1
+        return super()._connect(key)
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'Все {self.maxconn} соединений пула заняты')
+        try:
+            return super().getconn()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection):
+        try:
+            super().putconn(connection)
+        finally:
+            self.slots.release()
+
+    def as_dict(self):
+        return {
+            'max_size': self.maxconn,
+            'opened': self.opened,
+            'idle': len(self._pool),
+            'in_use': len(self._used),
+        }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pools = {}
+    pools_lock = threading.Lock()
+
+    def get_pool(self, conn_params=None):
+        # После fork у процесса свой пул: сокеты родителя не наследуются.
+        key = (os.getpid(), self.alias)
+        if key not in self.pools and conn_params is not None:
+            with self.pools_lock:
+                if key not in self.pools:
+                    self.pools[key] = ConnectionPool(
+                        self.settings_dict.get('POOL_MIN_SIZE', 1),
+                        self.settings_dict.get('POOL_MAX_SIZE', 10),
+                        self.settings_dict.get('POOL_TIMEOUT', 10),
+                        conn_params)
+        return self.pools.get(key)
+
+    @base.async_unsafe
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).getconn()
+        # Дальше как в базовом классе, но соединение уже открыто пулом.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection,
+                                               loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        # Незавершённую транзакцию пул откатит, а оборванное соединение
+        # закроет сам.
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().putconn(self.connection)
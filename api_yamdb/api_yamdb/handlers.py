@@ -0,0 +1,49 @@
+"""
+ASGI-обработчик, который выполняет чтение в пуле потоков.
+
+В Django 3.2 нет асинхронного ORM, а DRF не умеет асинхронные
+представления, поэтому под ASGI все синхронные представления и каждый шаг
+middleware по очереди ждут один общий поток. Здесь GET и HEAD целиком,
+вместе с middleware и отрисовкой ответа, уходят в пул из
+ASYNC_READ_THREADS потоков, а цикл событий продолжает принимать
+соединения. URL, фильтры, пагинация и права те же, потому что работают
+те же представления. Запросы на запись идут обычным путём ASGIHandler.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class ReadPoolASGIHandler(ASGIHandler):
+
+    def __init__(self):
+        super().__init__()
+        # Синхронная цепочка middleware для чтения в потоках пула.
+        self.sync_handler = BaseHandler()
+        self.sync_handler.load_middleware()
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_THREADS,
+            thread_name_prefix='async-read')
+        self.read_response = sync_to_async(
+            self.read, thread_sensitive=False, executor=self.executor)
+
+    def read(self, request):
+        # Сигналы начала и конца запроса закрывают соединения только
+        # общего потока, соединение потока пула подчиняется CONN_MAX_AGE
+        # здесь.
+        close_old_connections()
+        try:
+            return self.sync_handler.get_response(request)
+        finally:
+            close_old_connections()
+
+    async def get_response_async(self, request):
+        if request.method in READ_METHODS:
+            return await self.read_response(request)
+        return await super().get_response_async(request)
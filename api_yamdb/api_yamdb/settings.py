@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,7 +70,41 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # При DB_CONN_MAX_AGE больше 0 соединение переживает запрос
+        # и служит следующим запросам потока.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0)),
+        # Проверка SELECT 1 в начале запроса для переживших запрос
+        # соединений (api.connections.check_connections).
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='false').lower() == 'true',
+        # Только для ENGINE api_yamdb.db.postgresql_pool.
+        'POOL_MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default=1)),
+        'POOL_MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+    }
+}
+
+# Cache
+
+# По умолчанию у каждого процесса свой LocMemCache: свежесть ответов
+# проверяется по версиям в базе (api/cache.py), поэтому общий кэш не нужен,
+# а запись и вытеснение идут в памяти. Общий кэш — Redis или Memcached
+# через CACHE_BACKEND и CACHE_LOCATION. FileBasedCache при каждой записи
+# перечисляет каталог кэша, с ним MAX_ENTRIES нужно держать небольшим.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', default=300)),
+        'OPTIONS': {
+            # По умолчанию Django держит 300 записей и при переполнении
+            # удаляет треть кэша: страниц списков заметно больше.
+            'MAX_ENTRIES': int(
+                os.getenv('CACHE_MAX_ENTRIES', default=10000)),
+        },
     }
 }
 
@@ -111,7 +148,17 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+    ],
+    # orjson, если установлен, иначе стандартный json (api/renderers.py).
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -128,6 +175,32 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Наибольшее число объектов в пакетном запросе (api/bulk.py).
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', default=1000))
+
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', default=60))
+
+# Профилирование маршрутов (api/profiling.py), выключено по умолчанию.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='') == 'true'
+# Доля запросов под cProfile, 0 — без профилей.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', default=500))
+PROFILING_KEEP_PROFILES = int(os.getenv('PROFILING_KEEP_PROFILES', default=10))
+# Раз во сколько секунд писать сводку в журнал, 0 — не писать.
+PROFILING_DUMP_INTERVAL = float(
+    os.getenv('PROFILING_DUMP_INTERVAL', default=60))
+# Файл для сводки, {pid} заменяется номером процесса.
+PROFILING_DUMP_PATH = os.getenv('PROFILING_DUMP_PATH', default='')
+
+# Метрики Prometheus (api/metrics.py), выгрузка — GET /metrics.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='true') == 'true'
+# Общий каталог файлов метрик всех процессов gunicorn.
+METRICS_DIR = os.getenv('METRICS_DIR', default=os.path.join(
+    tempfile.gettempdir(), 'yamdb-metrics'))
+
+# Потоки для GET-запросов под ASGI (api_yamdb/handlers.py).
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', default=10))
+
 AUTH_USER_MODEL = 'reviews.User'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -137,3 +210,13 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 DEFAULT_FROM_EMAIL = 'admin@yamdb.com'
 EMAIL_HOST = 'localhost'
 EMAIL_PORT = 1025
+
+# Фоновая отправка писем (api/mail.py)
+
+MAIL_QUEUE_BATCH_SIZE = int(os.getenv('MAIL_QUEUE_BATCH_SIZE', default=50))
+MAIL_QUEUE_RETRIES = int(os.getenv('MAIL_QUEUE_RETRIES', default=3))
+MAIL_QUEUE_BACKOFF = float(os.getenv('MAIL_QUEUE_BACKOFF', default=1.0))
+MAIL_QUEUE_DURABLE = os.getenv('MAIL_QUEUE_DURABLE', default='') == 'true'
+# Через сколько секунд письмо, взятое упавшим процессом, можно взять снова.
+MAIL_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('MAIL_OUTBOX_CLAIM_TIMEOUT',
+                                          default=600))
@@ -0,0 +1,105 @@
+"""
+Настройки gunicorn из переменных окружения.
+
+GUNICORN_WORKER_CLASS выбирает модель обработки запросов:
+  sync     — процесс обслуживает один запрос за раз (WSGI);
+  gthread  — процесс с пулом из GUNICORN_THREADS потоков (WSGI);
+  uvicorn  — асинхронный цикл uvicorn поверх api_yamdb/asgi.py.
+Число процессов по умолчанию зависит от модели и доступных контейнеру CPU.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def available_cpus():
+    """CPU, доступные процессу: учитываются привязка и квота cgroup."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = multiprocessing.cpu_count()
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != 'max':
+            count = min(count, max(int(quota) // int(period), 1))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def default_workers(mode, cpus):
+    # Синхронный процесс простаивает, пока ждёт базу, поэтому их больше
+    # ядер; потоки и асинхронный цикл сами заполняют ожидание.
+    if mode == 'sync':
+        return 2 * cpus + 1
+    return cpus + 1 if mode == 'gthread' else cpus
+
+
+mode = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if mode not in WORKER_CLASSES:
+    raise ValueError(f'GUNICORN_WORKER_CLASS: {mode} не из '
+                     f'{", ".join(WORKER_CLASSES)}')
+
+worker_class = WORKER_CLASSES[mode]
+wsgi_app = ('api_yamdb.asgi:application' if mode == 'uvicorn'
+            else 'api_yamdb.wsgi:application')
+bind = os.environ.get('GUNICORN_BIND', '0:8000')
+workers = env_int('GUNICORN_WORKERS', default_workers(mode, available_cpus()))
+threads = env_int('GUNICORN_THREADS', 4 if mode == 'gthread' else 1)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Процесс перезапускается после max_requests запросов, разброс не даёт
+# всем процессам перезапуститься одновременно.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+# Приложение загружается до fork, память кода делится между процессами.
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # Соединения с базой, открытые мастером при загрузке приложения,
+    # закрываются до fork, чтобы один сокет не достался нескольким
+    # процессам.
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def metrics_dir():
+    return os.environ.get('METRICS_DIR') or os.path.join(
+        tempfile.gettempdir(), 'yamdb-metrics')
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска мастера: номера процессов могут
+    # повториться, и их счётчики сложились бы с новыми.
+    for path in glob.glob(os.path.join(metrics_dir(), '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    # Счётчики процесса, перезапущенного после max_requests, уходят
+    # в общий архив, а его файлы удаляются.
+    from api.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, metrics_dir())
@@ -37,6 +37,7 @@ class TitleAdmin(admin.ModelAdmin):
         'name',
         'year',
         'category',
+        'rating',
     )
     list_editable = ('name', 'year',)
     search_fields = ('name',)
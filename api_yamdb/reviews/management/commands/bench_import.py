@@ -0,0 +1,63 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from .generate_data import generate_rows
+from .load_all_data import SOURCES, bulk_load, copy_load
+
+
+def save_load(model, from_row, rows):
+    count = 0
+    for row in rows:
+        from_row(row).save()
+        count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость загрузки по одной строке, bulk_create '
+            'и COPY на сгенерированных данных. Все изменения откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--first-id', type=int, default=10 ** 9)
+        parser.add_argument(
+            '--strategies', nargs='+', default=['orm', 'bulk', 'copy'],
+            choices=['orm', 'bulk', 'copy'])
+
+    def handle(self, *args, **options):
+        reviews = options['reviews']
+        rows = generate_rows(
+            users=max(reviews // 10, 10), titles=max(reviews // 10, 1),
+            reviews=reviews, comments=reviews, seed=options['seed'],
+            first_id=options['first_id'])
+        total = sum(len(source_rows) for source_rows in rows.values())
+        for strategy in options['strategies']:
+            if strategy == 'copy' and connection.vendor != 'postgresql':
+                self.stdout.write('copy: пропущено, нужен PostgreSQL')
+                continue
+            seconds = self.run(strategy, rows, options['batch_size'])
+            self.stdout.write(
+                f'{strategy}: {total} строк за {seconds:.2f} с '
+                f'({total / seconds:.0f} строк/с)')
+
+    def run(self, strategy, rows, batch_size):
+        with transaction.atomic():
+            started = time.monotonic()
+            for name, model, _, from_row in SOURCES:
+                if strategy == 'orm':
+                    save_load(model, from_row, rows[name])
+                elif strategy == 'bulk':
+                    bulk_load(model, from_row, rows[name], batch_size)
+                else:
+                    copy_load(model, from_row, rows[name])
+            if connection.vendor == 'postgresql':
+                # Отложенные внешние ключи проверяются здесь, а не при откате.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            seconds = time.monotonic() - started
+            transaction.set_rollback(True)
+        return seconds
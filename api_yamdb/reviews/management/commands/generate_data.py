@@ -0,0 +1,141 @@
+import random
+import time
+from itertools import accumulate
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from reviews.models import CacheVersion, Category, Genre, Title
+
+from .load_all_data import SOURCES, bulk_load, reset_sequences
+
+
+def zipf_weights(count, skew):
+    """Веса популярности: первые элементы получают основную долю."""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def split_by_weights(total, weights, limit):
+    """Делит total пропорционально весам, не больше limit на элемент."""
+    norm = sum(weights)
+    counts = [min(int(total * weight / norm), limit) for weight in weights]
+    rest = total - sum(counts)
+    index = 0
+    while rest > 0 and index < len(counts):
+        extra = min(limit - counts[index], rest)
+        counts[index] += extra
+        rest -= extra
+        index += 1
+    return counts
+
+
+def generate_rows(users, titles, reviews, comments, genres=15,
+                  categories=3, skew=1.1, seed=1, first_id=1):
+    """
+    Строки в формате CSV-файлов static/data с перекосом популярности:
+    немногие произведения собирают большую часть отзывов, а немногие
+    отзывы — большую часть комментариев.
+    """
+    rnd = random.Random(seed)
+    now = timezone.now()
+    rows = {name: [] for name, *_ in SOURCES}
+    user_ids = range(first_id, first_id + users)
+    category_ids = range(first_id, first_id + categories)
+    genre_ids = range(first_id, first_id + genres)
+    title_ids = range(first_id, first_id + titles)
+    for user_id in user_ids:
+        rows['users'].append({
+            'id': user_id, 'username': f'user{user_id}',
+            'email': f'user{user_id}@yamdb.fake', 'role': 'user',
+            'bio': '', 'first_name': '', 'last_name': ''})
+    for category_id in category_ids:
+        rows['category'].append({
+            'id': category_id, 'name': f'Категория {category_id}',
+            'slug': f'category-{category_id}'})
+    for genre_id in genre_ids:
+        rows['genre'].append({
+            'id': genre_id, 'name': f'Жанр {genre_id}',
+            'slug': f'genre-{genre_id}'})
+    genre_weights = list(accumulate(zipf_weights(genres, skew)))
+    genre_title_id = first_id
+    for title_id in title_ids:
+        rows['titles'].append({
+            'id': title_id, 'name': f'Произведение {title_id}',
+            'year': rnd.randint(1900, now.year),
+            'category': rnd.choice(category_ids)})
+        title_genres = set(rnd.choices(
+            genre_ids, cum_weights=genre_weights, k=rnd.randint(1, 3)))
+        for genre_id in title_genres:
+            rows['genre_title'].append({
+                'id': genre_title_id, 'title_id': title_id,
+                'genre_id': genre_id})
+            genre_title_id += 1
+    # Один автор оставляет не больше одного отзыва на произведение.
+    review_id = first_id
+    per_title = split_by_weights(reviews, zipf_weights(titles, skew), users)
+    for title_id, count in zip(title_ids, per_title):
+        for author_id in rnd.sample(user_ids, count):
+            rows['review'].append({
+                'id': review_id, 'title_id': title_id,
+                'text': f'Отзыв {review_id}', 'author': author_id,
+                'score': min(max(int(rnd.gauss(7, 2)), 1), 10),
+                'pub_date': now - timezone.timedelta(
+                    minutes=rnd.randrange(10 ** 6))})
+            review_id += 1
+    if rows['review']:
+        review_weights = list(accumulate(
+            zipf_weights(len(rows['review']), skew)))
+        hot_reviews = rnd.choices(rows['review'],
+                                  cum_weights=review_weights, k=comments)
+        for comment_id, review in enumerate(hot_reviews, start=first_id):
+            rows['comments'].append({
+                'id': comment_id, 'review_id': review['id'],
+                'text': f'Комментарий {comment_id}',
+                'author': rnd.choice(user_ids),
+                'pub_date': review['pub_date'] + timezone.timedelta(
+                    minutes=rnd.randrange(10 ** 4))})
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными с перекосом популярности.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--genres', type=int, default=15)
+        parser.add_argument('--categories', type=int, default=3)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Новые id идут после уже существующих во всех таблицах.
+        first_id = 1 + max(
+            model.objects.aggregate(value=Max('id'))['value'] or 0
+            for _, model, *_ in SOURCES)
+        rows = generate_rows(
+            options['users'], options['titles'], options['reviews'],
+            options['comments'], options['genres'], options['categories'],
+            options['skew'], options['seed'], first_id)
+        started = time.monotonic()
+        with transaction.atomic():
+            for name, model, _, from_row in SOURCES:
+                count = bulk_load(model, from_row, rows[name],
+                                  options['batch_size'])
+                self.stdout.write(f'{name}: {count}')
+            new_titles = Title.objects.filter(id__gte=first_id)
+            new_titles.rebuild_ratings()
+            new_titles.rebuild_search_index(options['batch_size'])
+            new_titles.rebuild_score_histograms(options['batch_size'])
+            Category.objects.rebuild_title_counts()
+            Genre.objects.rebuild_title_counts()
+        reset_sequences([model for _, model, *_ in SOURCES])
+        CacheVersion.objects.bump(CacheVersion.CATALOGUE)
+        self.stdout.write(
+            f'Готово за {time.monotonic() - started:.1f} с')
@@ -1,8 +1,14 @@
 import csv
+import os
+import time
+from itertools import islice
 
-from django.core.management import BaseCommand
-from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
-                            Title, User)
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from reviews.models import (CacheVersion, Category, Comments, Genre,
+                            GenreTitle, Review, Title, User)
 
 
 def iter_csv(file_path: str):
@@ -12,59 +18,225 @@ def iter_csv(file_path: str):
             yield row
 
 
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def user_from_row(row):
+    return User(id=row['id'], username=row['username'],
+                email=row['email'], role=row['role'],
+                bio=row['bio'],
+                first_name=row['first_name'],
+                last_name=row['last_name'])
+
+
+def category_from_row(row):
+    return Category(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+def genre_from_row(row):
+    return Genre(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+def title_from_row(row):
+    return Title(id=row['id'], name=row['name'], year=int(row['year']),
+                 category_id=row['category'] or None)
+
+
+def genre_title_from_row(row):
+    return GenreTitle(id=row['id'], title_id=row['title_id'],
+                      genre_id=row['genre_id'])
+
+
+def review_from_row(row):
+    return Review(id=row['id'], title_id=row['title_id'], text=row['text'],
+                  author_id=row['author'], score=row['score'],
+                  pub_date=row['pub_date'])
+
+
+def comment_from_row(row):
+    return Comments(id=row['id'], review_id=row['review_id'],
+                    text=row['text'], author_id=row['author'],
+                    pub_date=row['pub_date'])
+
+
+def bulk_load(model, from_row, rows, batch_size, ignore_conflicts=False):
+    """
+    Вставляет строки пачками через bulk_create, возвращает их число.
+    bulk_create ставит в поля auto_now_add текущее время, поэтому даты
+    из строк записываются следом одним bulk_update на пачку.
+    """
+    date_fields = [field for field in model._meta.concrete_fields
+                   if getattr(field, 'auto_now_add', False)]
+    count = 0
+    for chunk in iter_chunks(rows, batch_size):
+        objects = [from_row(row) for row in chunk]
+        dates = [[getattr(obj, field.attname) for field in date_fields]
+                 for obj in objects]
+        model.objects.bulk_create(objects, batch_size=batch_size,
+                                  ignore_conflicts=ignore_conflicts)
+        if date_fields:
+            for obj, values in zip(objects, dates):
+                for field, value in zip(date_fields, values):
+                    setattr(obj, field.attname, value)
+            model.objects.bulk_update(
+                objects, [field.name for field in date_fields],
+                batch_size=batch_size)
+        count += len(chunk)
+    return count
+
+
+def reset_sequences(models):
+    """Сдвигает счётчики id после вставки строк с явными ключами."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def copy_escape(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class CopyStream:
+    """Файлоподобный объект, отдающий строки формата COPY ... TEXT."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    readline = read
+
+
+def copy_load(model, from_row, rows):
+    """
+    Передаёт строки в таблицу модели через COPY FROM STDIN (PostgreSQL).
+    Значения готовятся полями модели, но pre_save не вызывается,
+    поэтому даты из файлов сохраняются как есть.
+    """
+    fields = list(model._meta.concrete_fields)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields)
+    counter = {'rows': 0}
+
+    def lines():
+        for row in rows:
+            obj = from_row(row)
+            counter['rows'] += 1
+            yield '\t'.join(
+                copy_escape(field.get_db_prep_save(
+                    getattr(obj, field.attname), connection))
+                for field in fields) + '\n'
+
+    sql = (f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+           f'({columns}) FROM STDIN')
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(sql, CopyStream(lines()))
+    return counter['rows']
+
+
+# Файлы загружаются в порядке зависимостей внешних ключей.
+SOURCES = (
+    ('users', User, 'users.csv', user_from_row),
+    ('category', Category, 'category.csv', category_from_row),
+    ('genre', Genre, 'genre.csv', genre_from_row),
+    ('titles', Title, 'titles.csv', title_from_row),
+    ('genre_title', GenreTitle, 'genre_title.csv', genre_title_from_row),
+    ('review', Review, 'review.csv', review_from_row),
+    ('comments', Comments, 'comments.csv', comment_from_row),
+)
+
+
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        reader = iter_csv('static/data/users.csv')
-        for row in reader:
-            user = User(id=row['id'], username=row['username'],
-                        email=row['email'], role=row['role'],
-                        bio=row['bio'],
-                        first_name=row['first_name'],
-                        last_name=row['last_name'])
-            user.save()
-
-        reader = iter_csv('static/data/category.csv')
-        for row in reader:
-            category = Category(id=row['id'], name=row['name'],
-                                slug=row['slug'])
-            category.save()
+    help = 'Загружает данные из CSV-файлов пакетными вставками.'
 
-        reader = iter_csv('static/data/genre.csv')
-        for row in reader:
-            genre = Genre(id=row['id'], name=row['name'], slug=row['slug'])
-            genre.save()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с CSV-файлами.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной вставке.')
+        parser.add_argument(
+            '--only', nargs='+', choices=[name for name, *_ in SOURCES],
+            help='Загрузить только перечисленные файлы.')
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе.')
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загружать через COPY FROM STDIN (только PostgreSQL).')
 
-        reader = iter_csv('static/data/titles.csv')
-        for row in reader:
-            title = Title(id=row['id'], name=row['name'],
-                          year=int(row['year']),
-                          category=Category.objects.get(pk=row['category']), )
-            title.save()
+    def handle(self, *args, **options):
+        sources = [source for source in SOURCES
+                   if not options['only'] or source[0] in options['only']]
+        use_copy = options['copy']
+        if use_copy and options['ignore_conflicts']:
+            raise CommandError('--copy нельзя совмещать с --ignore-conflicts')
+        if use_copy and connection.vendor != 'postgresql':
+            self.stdout.write('COPY доступен только в PostgreSQL, '
+                              'используется пакетная вставка.')
+            use_copy = False
+        if use_copy:
+            # Одна транзакция на все файлы: внешние ключи в PostgreSQL
+            # объявлены DEFERRABLE и проверяются при фиксации.
+            with transaction.atomic():
+                loaded = self.load_sources(sources, options, use_copy)
+        else:
+            loaded = self.load_sources(sources, options, use_copy)
+        reset_sequences(loaded)
+        if Review in loaded:
+            # Вставки в обход save() не вызывают сигналы, рейтинг считаем
+            # заново.
+            Title.objects.rebuild_ratings()
+            Title.objects.rebuild_score_histograms(options['batch_size'])
+        if Title in loaded:
+            Title.objects.rebuild_search_index(options['batch_size'])
+            Category.objects.rebuild_title_counts()
+        if GenreTitle in loaded:
+            Genre.objects.rebuild_title_counts()
+        # Кэш ответов API не знает о вставках в обход сигналов.
+        CacheVersion.objects.bump(CacheVersion.CATALOGUE)
 
-        reader = iter_csv('static/data/genre_title.csv')
-        for row in reader:
-            genre_title = GenreTitle(id=row['id'],
-                                     title=Title.objects.get(
-                                         pk=row['title_id']),
-                                     genre=Genre.objects.get(
-                                         pk=row['genre_id']), )
-            genre_title.save()
-
-        reader = iter_csv('static/data/review.csv')
-        for row in reader:
-            review = Review(id=row['id'],
-                            title=Title.objects.get(pk=row['title_id']),
-                            text=row['text'],
-                            author=User.objects.get(pk=row['author']),
-                            score=row['score'], pub_date=row['pub_date'])
-            review.save()
-
-        reader = iter_csv('static/data/comments.csv')
-        for row in reader:
-            comment = Comments(id=row['id'],
-                               review=Review.objects.get(
-                                   pk=row['review_id']),
-                               text=row['text'],
-                               author=User.objects.get(pk=row['author']),
-                               pub_date=row['pub_date'])
-            comment.save()
+    def load_sources(self, sources, options, use_copy):
+        loaded = []
+        for name, model, file_name, from_row in sources:
+            rows = iter_csv(os.path.join(options['path'], file_name))
+            started = time.monotonic()
+            if use_copy:
+                count = copy_load(model, from_row, rows)
+            else:
+                with transaction.atomic():
+                    count = bulk_load(model, from_row, rows,
+                                      options['batch_size'],
+                                      options['ignore_conflicts'])
+            self.report(name, count, time.monotonic() - started)
+            loaded.append(model)
+        return loaded
+
+    def report(self, name, rows, seconds):
+        speed = rows / seconds if seconds else rows
+        self.stdout.write(
+            f'{name}: {rows} строк за {seconds:.2f} с ({speed:.0f} строк/с)')
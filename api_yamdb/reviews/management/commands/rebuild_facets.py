@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from reviews.models import CacheVersion, Category, Genre, Title
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число произведений в категориях и жанрах '
+            'и распределение оценок произведений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            categories = Category.objects.rebuild_title_counts()
+            genres = Genre.objects.rebuild_title_counts()
+            scores = Title.objects.rebuild_score_histograms(
+                options['batch_size'])
+        CacheVersion.objects.bump(CacheVersion.CATALOGUE)
+        self.stdout.write(f'Категорий: {categories}, жанров: {genres}, '
+                          f'строк распределения оценок: {scores}')
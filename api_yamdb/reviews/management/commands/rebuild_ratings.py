@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from reviews.models import CacheVersion, Title
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг и счётчики отзывов всех произведений.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Title.objects.rebuild_ratings()
+        CacheVersion.objects.bump(CacheVersion.CATALOGUE)
+        self.stdout.write(f'Пересчитано произведений: {updated}')
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from reviews.models import CacheVersion, Title
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс названий и описаний произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = Title.objects.rebuild_search_index(
+                options['batch_size'])
+        CacheVersion.objects.bump(CacheVersion.CATALOGUE)
+        self.stdout.write(f'Проиндексировано произведений: {indexed}')
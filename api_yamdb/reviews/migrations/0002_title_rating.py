@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    reviews = (Review.objects.filter(title=OuterRef('pk'))
+               .order_by().values('title'))
+    Title.objects.update(
+        review_count=Coalesce(Subquery(
+            reviews.annotate(value=Count('id')).values('value')), 0),
+        score_sum=Coalesce(Subquery(
+            reviews.annotate(value=Sum('score')).values('value')), 0),
+        rating=Subquery(reviews.annotate(value=Avg('score')).values('value')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(blank=True, null=True, verbose_name='Рейтинг произведения'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2 on 2026-10-18 17:36
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Копия reviews.search на момент миграции: миграция не должна зависеть
+# от того, как код приложения разбивает текст позже.
+TOKEN_LENGTH = 64
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    if not text:
+        return []
+    words = re.findall(r'\w+', text.lower().replace('ё', 'е'))
+    return [word[:TOKEN_LENGTH] for word in words]
+
+
+def token_weights(name, description):
+    weights = {}
+    for text, weight in ((name, NAME_WEIGHT),
+                         (description, DESCRIPTION_WEIGHT)):
+        for token in tokenize(text):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def fill_search_index(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleToken = apps.get_model('reviews', 'TitleToken')
+    rows = Title.objects.values_list('pk', 'name', 'description')
+    tokens = []
+    for title_id, name, description in rows.iterator():
+        tokens.extend(
+            TitleToken(title_id=title_id, token=token, weight=weight)
+            for token, weight in token_weights(name, description).items())
+        if len(tokens) >= 1000:
+            TitleToken.objects.bulk_create(tokens)
+            tokens = []
+    TitleToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Вес слова')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='reviews.title', verbose_name='Произведение')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='titletoken',
+            index=models.Index(fields=['token', 'title'], name='titletoken_prefix_idx', opclasses=('varchar_pattern_ops', 'int8_ops')),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
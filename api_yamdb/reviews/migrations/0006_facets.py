@@ -0,0 +1,60 @@
+# Generated by Django 3.2 on 2026-10-18 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_facets(apps, schema_editor):
+    Category = apps.get_model('reviews', 'Category')
+    Genre = apps.get_model('reviews', 'Genre')
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    TitleScore = apps.get_model('reviews', 'TitleScore')
+    for model, rows, field in ((Category, Title, 'category'),
+                               (Genre, GenreTitle, 'genre')):
+        counts = (rows.objects.filter(**{field: OuterRef('pk')}).order_by()
+                  .values(field).annotate(value=Count('id')).values('value'))
+        model.objects.update(title_count=Coalesce(Subquery(counts), 0))
+    rows = (Review.objects.order_by().values('title', 'score')
+            .annotate(value=Count('id')))
+    TitleScore.objects.bulk_create(
+        [TitleScore(title_id=row['title'], score=row['score'],
+                    count=row['value']) for row in rows.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='title_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество произведений'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='title_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество произведений'),
+        ),
+        migrations.CreateModel(
+            name='TitleScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='reviews.title', verbose_name='Произведение')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='titlescore',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique title score'),
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
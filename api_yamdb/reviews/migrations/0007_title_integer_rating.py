@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 18:11
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import NullIf
+
+
+def round_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    score_sum, review_count = F('score_sum'), F('review_count')
+    Title.objects.update(
+        rating=(score_sum * 2 + review_count) / NullIf(review_count * 2, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_facets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Рейтинг произведения'),
+        ),
+        migrations.RunPython(round_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating', 'id'], name='title_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailoutbox',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взято на отправку'),
+        ),
+        migrations.AddField(
+            model_name='mailoutbox',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=32, verbose_name='Кем взято на отправку'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-18 18:44
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_mail_outbox_claim'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(django.db.models.expressions.ExpressionWrapper(models.Q(('rating__isnull', True)), output_field=models.BooleanField()), django.db.models.expressions.F('rating'), django.db.models.expressions.F('id'), name='title_unrated_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(django.db.models.expressions.ExpressionWrapper(models.Q(('rating__isnull', False)), output_field=models.BooleanField()), django.db.models.expressions.F('rating'), django.db.models.expressions.F('id'), name='title_rated_rating_idx'),
+        ),
+    ]
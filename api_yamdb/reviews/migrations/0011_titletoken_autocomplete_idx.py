@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_title_rating_nulls_last'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='titletoken',
+            index=models.Index(fields=['token', '-weight', 'title'], name='titletoken_autocomplete_idx', opclasses=('varchar_pattern_ops', 'int2_ops', 'int8_ops')),
+        ),
+    ]
@@ -1,6 +1,15 @@
+import uuid
+from datetime import timedelta
+
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import (Count, ExpressionWrapper, F, OuterRef, Q,
+                              Subquery, Sum)
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from .search import prefix_filter, query_filter, token_weights, tokenize
 
 
 class Roles(models.TextChoices):
@@ -39,6 +48,13 @@ class User(AbstractUser):
     def __str__(self):
         return f'{self.username}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Имя выводится в отзывах и комментариях: его смену ловит сигнал.
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
     @property
     def is_admin(self):
         return (self.role == Roles.ADMIN
@@ -50,6 +66,30 @@ class User(AbstractUser):
         return self.role == Roles.MODERATOR
 
 
+class TitleCountQuerySet(models.QuerySet):
+    def shift_title_count(self, delta):
+        """Сдвигает число произведений одним UPDATE."""
+        return self.update(title_count=F('title_count') + delta)
+
+
+class CategoryQuerySet(TitleCountQuerySet):
+    def rebuild_title_counts(self):
+        """Пересчитывает число произведений по таблице произведений."""
+        titles = (Title.objects.filter(category=OuterRef('pk')).order_by()
+                  .values('category').annotate(value=Count('id'))
+                  .values('value'))
+        return self.update(title_count=Coalesce(Subquery(titles), 0))
+
+
+class GenreQuerySet(TitleCountQuerySet):
+    def rebuild_title_counts(self):
+        """Пересчитывает число произведений по связям с жанрами."""
+        titles = (GenreTitle.objects.filter(genre=OuterRef('pk')).order_by()
+                  .values('genre').annotate(value=Count('id'))
+                  .values('value'))
+        return self.update(title_count=Coalesce(Subquery(titles), 0))
+
+
 class Category(models.Model):
     name = models.CharField(
         max_length=30,
@@ -60,6 +100,12 @@ class Category(models.Model):
         max_length=20,
         verbose_name='slug-значение категории'
     )
+    title_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество произведений',
+    )
+
+    objects = CategoryQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.name}'
@@ -75,11 +121,147 @@ class Genre(models.Model):
         max_length=20,
         verbose_name='slug-значение жанра'
     )
+    title_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество произведений',
+    )
+
+    objects = GenreQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.name}'
 
 
+def rounded_rating(score_sum, review_count):
+    """
+    Средняя оценка, округлённая до целого (половина — вверх), в целых
+    числах базы: (2 * сумма + число) / (2 * число). Без отзывов — NULL.
+    """
+    return (score_sum * 2 + review_count) / NullIf(review_count * 2, 0)
+
+
+def has_rating(rated):
+    """Условие «у произведения есть (нет) рейтинга» как выражение."""
+    return ExpressionWrapper(Q(rating__isnull=not rated),
+                             output_field=models.BooleanField())
+
+
+# Порядок по рейтингу: произведения без отзывов идут последними в обе
+# стороны. SQLite и PostgreSQL ставят NULL с разных концов, поэтому
+# порядок задаёт явный ключ rated/unrated, а не NULLS LAST; у каждого
+# направления свой индекс, и страницы читаются из него без сортировки.
+RATING_ORDERINGS = {
+    'rating': ('unrated', 'rating', 'id'),
+    '-rating': ('-rated', '-rating', '-id'),
+}
+
+
+class TitleQuerySet(models.QuerySet):
+    def apply_review_delta(self, count_delta, score_delta):
+        """Сдвигает счётчики отзывов и пересчитывает рейтинг одним UPDATE."""
+        review_count = F('review_count') + count_delta
+        score_sum = F('score_sum') + score_delta
+        return self.update(
+            review_count=review_count,
+            score_sum=score_sum,
+            rating=rounded_rating(score_sum, review_count),
+        )
+
+    def order_by_rating(self, ordering):
+        """Сортировка RATING_ORDERINGS[ordering] с нужным ей ключом."""
+        return self.annotate(
+            rated=has_rating(True), unrated=has_rating(False),
+        ).order_by(*RATING_ORDERINGS[ordering])
+
+    def rebuild_ratings(self):
+        """Пересчитывает счётчики и рейтинг по таблице отзывов."""
+        reviews = (Review.objects.filter(title=OuterRef('pk'))
+                   .order_by().values('title'))
+        updated = self.update(
+            review_count=Coalesce(Subquery(
+                reviews.annotate(value=Count('id')).values('value')), 0),
+            score_sum=Coalesce(Subquery(
+                reviews.annotate(value=Sum('score')).values('value')), 0),
+        )
+        # В UPDATE выражения видят прежние значения строки, поэтому
+        # рейтинг считается вторым запросом по уже записанным счётчикам.
+        self.update(rating=rounded_rating(F('score_sum'), F('review_count')))
+        return updated
+
+    def rebuild_score_histograms(self, batch_size=1000):
+        """Пересчитывает распределение оценок по таблице отзывов."""
+        TitleScore.objects.filter(title__in=self.values('pk')).delete()
+        rows = (Review.objects.filter(title__in=self.values('pk')).order_by()
+                .values('title', 'score').annotate(value=Count('id')))
+        return len(TitleScore.objects.bulk_create(
+            [TitleScore(title_id=row['title'], score=row['score'],
+                        count=row['value']) for row in rows.iterator()],
+            batch_size=batch_size))
+
+    def rebuild_search_index(self, batch_size=1000):
+        """Заново раскладывает названия и описания на слова поиска."""
+        TitleToken.objects.filter(title__in=self.values('pk')).delete()
+        tokens = []
+        count = 0
+        rows = self.order_by().values_list('pk', 'name', 'description')
+        for title_id, name, description in rows.iterator():
+            tokens.extend(
+                TitleToken(title_id=title_id, token=token, weight=weight)
+                for token, weight in token_weights(name, description).items())
+            if len(tokens) >= batch_size:
+                TitleToken.objects.bulk_create(tokens, batch_size=batch_size)
+                tokens = []
+            count += 1
+        TitleToken.objects.bulk_create(tokens, batch_size=batch_size)
+        return count
+
+    def search(self, query):
+        """
+        Произведения, в названии или описании которых есть слова запроса,
+        от более релевантных к менее. Релевантность — сумма весов
+        совпавших слов.
+        """
+        words = tokenize(query)
+        if not words:
+            return self.none()
+        matches = TitleToken.objects.filter(query_filter(words))
+        relevance = (matches.filter(title=OuterRef('pk')).order_by()
+                     .values('title').annotate(value=Sum('weight'))
+                     .values('value'))
+        return (self.filter(pk__in=matches.values('title'))
+                .annotate(relevance=Subquery(relevance))
+                .order_by('-relevance', 'pk'))
+
+    def autocomplete(self, query, limit=10, window=200):
+        """
+        Подсказки для начала запроса: произведения со словом, которое
+        начинается с последнего слова запроса и содержит остальные.
+        Ранжируются первые window совпадений в порядке индекса
+        (слово, вес, произведение): сначала точное совпадение с префиксом,
+        внутри одного слова — названия раньше описаний. Запрос читает
+        не больше window строк индекса и ничего не сортирует, так что
+        время ответа не зависит от числа совпадений.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        *complete, prefix = words
+        matches = TitleToken.objects.filter(prefix_filter(prefix))
+        for word in complete:
+            # Подзапрос, а не соединение: иначе планировщик начинает
+            # с полного слова и сортирует все совпадения префикса.
+            matches = matches.filter(title__in=TitleToken.objects.filter(
+                token=word).values('title'))
+        weights = {}
+        for title_id, weight in matches.order_by(
+                'token', '-weight', 'title_id').values_list(
+                'title_id', 'weight')[:window]:
+            weights[title_id] = weights.get(title_id, 0) + weight
+        best = sorted(weights, key=lambda pk: (-weights[pk], pk))[:limit]
+        names = dict(self.filter(pk__in=best).values_list('pk', 'name'))
+        return [{'id': pk, 'name': names[pk]} for pk in best if pk in names]
+
+
 class Title(models.Model):
     name = models.CharField(
         max_length=200,
@@ -99,14 +281,150 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория произведения')
     genre = models.ManyToManyField(Genre, through='GenreTitle', )
+    rating = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Рейтинг произведения',
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов',
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок',
+    )
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('year',), name='title_year_idx'),
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('rating', 'id'), name='title_rating_idx'),
+            models.Index(has_rating(False), F('rating'), F('id'),
+                         name='title_unrated_rating_idx'),
+            models.Index(has_rating(True), F('rating'), F('id'),
+                         name='title_rated_rating_idx'),
+        ]
 
     def get_genre(self):
         return "\n".join([p.slug for p in self.genre.all()])
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Категория на момент загрузки нужна для счётчиков категорий.
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self._loaded_category_id = self.category_id
+
     def __str__(self):
         return f'{self.name} {self.category}'
 
 
+class TitleToken(models.Model):
+    """Слово из названия или описания произведения для поиска."""
+    token = models.CharField(
+        max_length=64,
+        verbose_name='Слово',
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='tokens',
+        verbose_name='Произведение')
+    weight = models.PositiveSmallIntegerField(
+        verbose_name='Вес слова',
+    )
+
+    class Meta:
+        indexes = [
+            # Поиск по префиксу слова: LIKE 'x%' в PostgreSQL читает
+            # только индекс с varchar_pattern_ops, другие СУБД opclasses
+            # не учитывают.
+            models.Index(fields=('token', 'title'),
+                         name='titletoken_prefix_idx',
+                         opclasses=('varchar_pattern_ops', 'int8_ops')),
+            # Окно подсказок читается в порядке индекса без сортировки.
+            models.Index(fields=('token', '-weight', 'title'),
+                         name='titletoken_autocomplete_idx',
+                         opclasses=('varchar_pattern_ops', 'int2_ops',
+                                    'int8_ops')),
+        ]
+
+    def __str__(self):
+        return f'{self.token} {self.title_id}'
+
+
+class TitleScoreQuerySet(models.QuerySet):
+    def shift(self, title_id, score, delta):
+        """Сдвигает число оценок score у произведения, создавая строку."""
+        rows = self.filter(title_id=title_id, score=score)
+        if rows.update(count=F('count') + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(title_id=title_id, score=score, count=delta)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос.
+            rows.update(count=F('count') + delta)
+
+
+class TitleScore(models.Model):
+    """Число отзывов с оценкой score у произведения."""
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='scores',
+        verbose_name='Произведение')
+    score = models.PositiveSmallIntegerField(
+        verbose_name='Оценка',
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов',
+    )
+
+    objects = TitleScoreQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('title', 'score'),
+                name='unique title score'
+            )]
+
+    def __str__(self):
+        return f'{self.title_id} {self.score}: {self.count}'
+
+
+class GenreTitleQuerySet(models.QuerySet):
+    def delete_for_titles(self, title_ids):
+        """
+        Удаляет жанры произведений одним DELETE без сигналов post_delete.
+        Счётчики жанров и версии кэша вызывающий пересчитывает сам,
+        один раз на пакет. Возвращает число удалённых строк.
+        """
+        title_ids = list(title_ids)
+        if not title_ids:
+            return 0
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        column = quote(self.model._meta.get_field('title').column)
+        placeholders = ', '.join(['%s'] * len(title_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {column} IN ({placeholders})',
+                title_ids)
+            return cursor.rowcount
+
+
 class GenreTitle(models.Model):
     title = models.ForeignKey(
         Title,
@@ -121,9 +439,22 @@ class GenreTitle(models.Model):
         related_name='genre',
         verbose_name='Жанр')
 
+    objects = GenreTitleQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.title} {self.genre}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_genre_id = instance.__dict__.get('genre_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self._loaded_genre_id = self.genre_id
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -156,11 +487,32 @@ class Review(models.Model):
                 fields=('title', 'author',),
                 name='unique review'
             )]
+        indexes = [
+            # Отзывы произведения по убыванию даты, id различает равные даты.
+            models.Index(fields=('title', '-pub_date', '-id'),
+                         name='review_title_pub_date_idx'),
+        ]
         ordering = ('-pub_date',)
 
     def __str__(self):
         return f'{self.author} {self.text}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения на момент загрузки нужны, чтобы сдвинуть рейтинг на разницу.
+        instance._loaded_score = instance.__dict__.get('score')
+        instance._loaded_title_id = instance.__dict__.get('title_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Отзыв и счётчики произведения меняются в одной транзакции:
+        # обработчик post_save выполняется внутри этого блока.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self._loaded_score = self.score
+        self._loaded_title_id = self.title_id
+
 
 class Comments(models.Model):
     review = models.ForeignKey(
@@ -183,5 +535,128 @@ class Comments(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=('review', 'pub_date', 'id'),
+                         name='comment_review_pub_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.author} {self.text}'
+
+
+class MailOutboxQuerySet(models.QuerySet):
+    def claim(self, timeout):
+        """
+        Забирает неотправленные письма на отправку и возвращает их.
+        Одно UPDATE помечает строки меткой владельца, поэтому каждую строку
+        получает только один процесс. Письма, взятые больше timeout секунд
+        назад и так и не отправленные, можно взять снова.
+        """
+        now = timezone.now()
+        owner = uuid.uuid4().hex
+        self.filter(
+            Q(claimed=None) | Q(claimed__lt=now - timedelta(seconds=timeout)),
+            sent=None,
+        ).update(claimed=now, claimed_by=owner)
+        return list(self.model.objects.filter(claimed_by=owner, sent=None))
+
+
+class MailOutbox(models.Model):
+    subject = models.CharField(
+        max_length=255,
+        verbose_name='Тема письма',
+    )
+    message = models.TextField(
+        verbose_name='Текст письма',
+    )
+    from_email = models.CharField(
+        max_length=254,
+        blank=True,
+        verbose_name='Отправитель',
+    )
+    recipients = models.TextField(
+        verbose_name='Получатели через запятую',
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+    sent = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name='Дата отправки',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки отправки',
+    )
+    claimed = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Взято на отправку',
+    )
+    claimed_by = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Кем взято на отправку',
+    )
+
+    objects = MailOutboxQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('created',)
+
+    def __str__(self):
+        return f'{self.recipients} {self.subject}'
+
+
+class CacheVersionQuerySet(models.QuerySet):
+    def bump(self, *namespaces):
+        """Сдвигает версии пространств, недостающие строки заводит."""
+        namespaces = sorted(set(namespaces))
+        now = timezone.now()
+        versions = self.filter(namespace__in=namespaces)
+        changes = {'version': F('version') + 1, 'updated': now}
+        if versions.update(**changes) < len(namespaces):
+            # Строку мог завести и параллельный запрос, поэтому после
+            # вставки версии сдвигаются ещё раз по всем строкам.
+            self.bulk_create(
+                [CacheVersion(namespace=namespace, updated=now)
+                 for namespace in namespaces], ignore_conflicts=True)
+            versions.update(**changes)
+
+    def forget(self, *namespaces):
+        """Удаляет строки пространств, чтобы они не копились."""
+        self.filter(namespace__in=namespaces).delete()
+
+
+class CacheVersion(models.Model):
+    """
+    Версия пространства кэша ответов API. Хранится в базе, поэтому
+    одинакова во всех процессах и подах при любом бэкенде кэша,
+    и сдвигается после фиксации транзакции с данными.
+    """
+    # Общее пространство: его сдвигают загрузки и пересчёты в обход API.
+    CATALOGUE = 'catalogue'
+
+    namespace = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Пространство кэша',
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия',
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+    )
+
+    objects = CacheVersionQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.namespace} {self.version}'
@@ -0,0 +1,54 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+TOKEN_LENGTH = 64
+# Слово из названия весит больше слова из описания.
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+# Короткие префиксы совпадают с слишком многими словами.
+MIN_PREFIX_LENGTH = 3
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, ё приводится к е."""
+    if not text:
+        return []
+    words = re.findall(r'\w+', text.lower().replace('ё', 'е'))
+    return [word[:TOKEN_LENGTH] for word in words]
+
+
+def token_weights(name, description):
+    """Вес каждого слова произведения для ранжирования поиска."""
+    weights = {}
+    for text, weight in ((name, NAME_WEIGHT),
+                         (description, DESCRIPTION_WEIGHT)):
+        for token in tokenize(text):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def prefix_filter(prefix, field='token'):
+    """
+    Условие «слово начинается с prefix», которое читает индекс.
+    В PostgreSQL LIKE 'x%' использует индекс с varchar_pattern_ops,
+    в SQLite LIKE регистронезависим и индекс не читает, поэтому префикс
+    превращается в диапазон.
+    """
+    if connection.vendor == 'postgresql':
+        return Q(**{f'{field}__startswith': prefix})
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+
+
+def query_filter(words):
+    """
+    Условие совпадения слов запроса: все слова целиком, последнее
+    ещё и как начало слова, если оно не короче MIN_PREFIX_LENGTH.
+    """
+    *_, last = words
+    condition = Q(token__in=words)
+    if len(last) >= MIN_PREFIX_LENGTH:
+        condition |= prefix_filter(last)
+    return condition
@@ -0,0 +1,109 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Genre, GenreTitle, Review, Title, TitleScore
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    """Сдвигает рейтинг произведения при создании и изменении отзыва."""
+    if raw:
+        return
+    titles = Title.objects.filter(pk=instance.title_id)
+    if created:
+        titles.apply_review_delta(1, instance.score)
+        TitleScore.objects.shift(instance.title_id, instance.score, 1)
+        return
+    old_score = getattr(instance, '_loaded_score', None)
+    old_title_id = getattr(instance, '_loaded_title_id', None)
+    if old_score is None or old_title_id is None:
+        # Отзыв загружен без оценки или произведения: считаем заново.
+        changed = Title.objects.filter(
+            pk__in={instance.title_id, old_title_id})
+        changed.rebuild_ratings()
+        changed.rebuild_score_histograms()
+        return
+    if old_title_id != instance.title_id:
+        Title.objects.filter(pk=old_title_id).apply_review_delta(
+            -1, -old_score)
+        titles.apply_review_delta(1, instance.score)
+    elif old_score != instance.score:
+        titles.apply_review_delta(0, instance.score - old_score)
+    else:
+        return
+    TitleScore.objects.shift(old_title_id, old_score, -1)
+    TitleScore.objects.shift(instance.title_id, instance.score, 1)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Убирает оценку удалённого отзыва из рейтинга произведения."""
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        -1, -instance.score)
+    TitleScore.objects.shift(instance.title_id, instance.score, -1)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет слова поиска, если изменились название или описание."""
+    if raw or (update_fields is not None
+               and not {'name', 'description'} & set(update_fields)):
+        return
+    Title.objects.filter(pk=instance.pk).rebuild_search_index()
+
+
+@receiver(post_save, sender=Title)
+def title_category_saved(sender, instance, created, raw=False, **kwargs):
+    """Переносит произведение в счётчике категорий."""
+    if raw:
+        return
+    old_category_id = (None if created
+                       else getattr(instance, '_loaded_category_id', None))
+    if old_category_id == instance.category_id:
+        return
+    if old_category_id is not None:
+        Category.objects.filter(pk=old_category_id).shift_title_count(-1)
+    if instance.category_id is not None:
+        Category.objects.filter(pk=instance.category_id).shift_title_count(1)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    if instance.category_id is not None:
+        Category.objects.filter(pk=instance.category_id).shift_title_count(-1)
+
+
+@receiver(post_save, sender=GenreTitle)
+def genre_title_saved(sender, instance, created, raw=False, **kwargs):
+    """Сдвигает счётчики жанров при создании и изменении связи."""
+    if raw:
+        return
+    old_genre_id = (None if created
+                    else getattr(instance, '_loaded_genre_id', None))
+    if old_genre_id == instance.genre_id:
+        return
+    if old_genre_id is not None:
+        Genre.objects.filter(pk=old_genre_id).shift_title_count(-1)
+    if instance.genre_id is not None:
+        Genre.objects.filter(pk=instance.genre_id).shift_title_count(1)
+
+
+@receiver(post_delete, sender=GenreTitle)
+def genre_title_deleted(sender, instance, **kwargs):
+    if instance.genre_id is not None:
+        Genre.objects.filter(pk=instance.genre_id).shift_title_count(-1)
+
+
+@receiver(m2m_changed, sender=GenreTitle)
+def title_genres_added(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Title.genre.add() и set() создают связи bulk_create без post_save.
+    Удаление связей через remove() и clear() идёт обычным delete()
+    и учитывается в genre_title_deleted.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        Genre.objects.filter(pk=instance.pk).shift_title_count(len(pk_set))
+    else:
+        Genre.objects.filter(pk__in=pk_set).shift_title_count(1)
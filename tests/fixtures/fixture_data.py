@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def categories():
+    from reviews.models import Category
+
+    return [
+        Category.objects.create(name='Фильм', slug='movie'),
+        Category.objects.create(name='Книга', slug='book'),
+    ]
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+        Genre.objects.create(name='Вестерн', slug='western'),
+    ]
+
+
+@pytest.fixture
+def titles(categories, genres):
+    from reviews.models import Title
+
+    result = []
+    for number in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {number}',
+            year=1990 + number % 3,
+            description=f'Описание {number}',
+            category=categories[number % 2],
+        )
+        title.genre.set(genres[:number % 3 + 1])
+        result.append(title)
+    return result
+
+
+@pytest.fixture
+def reviews(titles, user, another_user):
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(
+            title=titles[0], author=user, text='Отзыв', score=10),
+        Review.objects.create(
+            title=titles[0], author=another_user, text='Отзыв', score=5),
+        Review.objects.create(
+            title=titles[1], author=user, text='Отзыв', score=3),
+    ]
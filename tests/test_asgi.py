@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+
+def request(application, url, method='GET', body=b'', headers=()):
+    """Один запрос к ASGI-приложению, возвращает статус, заголовки, тело."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': parts.path,
+        'raw_path': parts.path.encode(), 'root_path': '',
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'testserver'),
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()),
+                    *headers],
+        'client': ['127.0.0.1', 0], 'server': ['testserver', 80],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await application(scope, receive, send)
+
+    return scope, messages, run
+
+
+def call_all(application, urls, **kwargs):
+    calls = [request(application, url, **kwargs) for url in urls]
+
+    async def run():
+        await asyncio.gather(*(run() for _, _, run in calls))
+
+    asyncio.run(run())
+    results = []
+    for _, messages, _ in calls:
+        start, *bodies = messages
+        results.append((start['status'], dict(start['headers']),
+                        b''.join(message.get('body', b'')
+                                 for message in bodies)))
+    return results
+
+
+@pytest.fixture
+def application():
+    from api_yamdb.handlers import ReadPoolASGIHandler
+
+    return ReadPoolASGIHandler()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReadPoolASGIHandler:
+
+    def urls(self, reviews):
+        title_id = reviews[0].title_id
+        return [
+            '/api/v1/categories/',
+            '/api/v1/genres/?search=%D0%B4%D1%80',
+            '/api/v1/titles/?genre=drama&year=1990',
+            f'/api/v1/titles/{title_id}/',
+            '/api/v1/titles/?cursor=&limit=3',
+            f'/api/v1/titles/{title_id}/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/{reviews[0].id}/comments/',
+            '/api/v1/titles/999999/',
+        ]
+
+    def test_same_responses(self, application, client, reviews):
+        from django.core.cache import cache
+
+        urls = self.urls(reviews)
+        expected = [client.get(url) for url in urls]
+        cache.clear()
+        for url, sync, (status, headers, body) in zip(
+                urls, expected, call_all(application, urls)):
+            assert status == sync.status_code, url
+            assert body == sync.content, (
+                f'Проверьте, что {url} отвечает так же, как под WSGI'
+            )
+            assert headers[b'Content-Type'] == sync['Content-Type'].encode()
+
+    def test_reads_run_in_pool(self, application, titles, monkeypatch):
+        from api.views import TitleViewSet
+
+        threads = set()
+        get_queryset = TitleViewSet.get_queryset
+
+        def recording(self):
+            threads.add(threading.current_thread().name)
+            return get_queryset(self)
+
+        monkeypatch.setattr(TitleViewSet, 'get_queryset', recording)
+        results = call_all(application, [f'/api/v1/titles/?year={year}'
+                                         for year in (1990, 1991, 1992)])
+        assert all(status == 200 for status, *_ in results)
+        assert threads and all(name.startswith('async-read')
+                               for name in threads), (
+            'Проверьте, что чтение выполняется в пуле потоков'
+        )
+
+    def test_permissions_and_writes(self, application, titles, admin):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        body = json.dumps({'name': 'Музыка', 'slug': 'music'}).encode()
+        token = str(RefreshToken.for_user(admin).access_token)
+        [(anonymous, *_)] = call_all(application, ['/api/v1/categories/'],
+                                     method='POST', body=body)
+        [(created, *_)] = call_all(
+            application, ['/api/v1/categories/'], method='POST', body=body,
+            headers=[(b'authorization', f'Bearer {token}'.encode())])
+        [(_, _, listed)] = call_all(application, ['/api/v1/categories/'])
+        assert anonymous == 401
+        assert created == 201
+        assert 'music' in {category['slug']
+                           for category in json.loads(listed)['results']}
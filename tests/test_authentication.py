@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+
+    def test_user_served_from_cache(self, user_client, user,
+                                    django_assert_num_queries):
+        from api.authentication import USER_CACHE_KEY
+        from django.core.cache import cache
+
+        user_client.get('/api/v1/users/me/')
+        # Пользователь из кэша, из базы читается только строка профиля.
+        with django_assert_num_queries(1):
+            response = user_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == 'TestUser'
+        assert cache.get(USER_CACHE_KEY.format(user.pk)) == (
+            user.pk, 'user', False, False, True), (
+            'Проверьте, что в кэше только поля для проверки прав'
+        )
+
+    def test_write_uses_fresh_user(self, admin_client, user_client, admin,
+                                   user):
+        from django.contrib.auth import get_user_model
+
+        admin_client.get('/api/v1/users/')
+        user_client.get('/api/v1/users/me/')
+        # Изменения в обход сигналов, как в процессе с другим кэшем.
+        get_user_model().objects.filter(pk=admin.pk).update(role='user')
+        get_user_model().objects.filter(pk=user.pk).update(role='moderator')
+        response = admin_client.post('/api/v1/categories/', data={
+            'name': 'Книги', 'slug': 'books'})
+        assert response.status_code == 403, (
+            'Проверьте, что запись проверяет роль по строке из базы'
+        )
+        response = user_client.patch('/api/v1/users/me/',
+                                     data={'bio': 'новое'})
+        assert response.status_code == 200
+        assert response.json()['role'] == 'moderator', (
+            'Проверьте, что users/me/ не затирает роль из устаревшего кэша'
+        )
+
+    def test_role_change_applies_immediately(self, admin_client,
+                                             user_client, user):
+        assert user_client.get('/api/v1/users/').status_code == 403
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'})
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кэш пользователя'
+        )
+
+    def test_token_carries_only_user_id(self, client, user):
+        from django.contrib.auth.tokens import default_token_generator
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        response = client.post('/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user)})
+        token = AccessToken(response.json()['token'])
+        assert token['user_id'] == user.pk
+        assert not {'role', 'is_staff', 'is_superuser'} & set(
+            token.payload), (
+            'Проверьте, что права берутся из базы, а не из токена'
+        )
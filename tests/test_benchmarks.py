@@ -0,0 +1,101 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestBenchmarks:
+
+    def test_generate_data_and_bench_api(self):
+        from reviews.models import Review, Title
+
+        call_command('generate_data', users=30, titles=20, reviews=200,
+                     comments=50, stdout=StringIO())
+        assert Review.objects.count() == 200
+        counts = list(Title.objects.order_by('-review_count')
+                      .values_list('review_count', flat=True))
+        assert counts[0] > counts[-1], (
+            'Проверьте, что отзывы распределены неравномерно'
+        )
+
+        out = StringIO()
+        call_command('bench_api', repeat=2, stdout=out)
+        report = json.loads(out.getvalue())
+        assert 'comments-list' in report['endpoints']
+        for name, result in report['endpoints'].items():
+            assert {'p50_ms', 'p95_ms', 'queries', 'duplicate_queries',
+                    'rows_scanned'} <= set(result), (
+                f'Проверьте поля отчёта для сценария {name}'
+            )
+
+
+class TestServerBenchmark:
+
+    def read_config(self, monkeypatch, **env):
+        import os
+        import runpy
+
+        from django.conf import settings
+
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(
+            os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+
+    def test_gunicorn_config(self, monkeypatch):
+        config = self.read_config(monkeypatch)
+        assert config['worker_class'] == 'sync'
+        assert config['wsgi_app'] == 'api_yamdb.wsgi:application'
+        assert config['workers'] == 2 * config['available_cpus']() + 1
+        assert config['preload_app'] and config['max_requests']
+
+        config = self.read_config(monkeypatch,
+                                  GUNICORN_WORKER_CLASS='uvicorn',
+                                  GUNICORN_WORKERS='3',
+                                  GUNICORN_PRELOAD='false')
+        assert config['worker_class'] == 'uvicorn.workers.UvicornWorker'
+        assert config['wsgi_app'] == 'api_yamdb.asgi:application', (
+            'Проверьте, что uvicorn запускает приложение из asgi.py'
+        )
+        assert config['workers'] == 3
+        assert not config['preload_app']
+
+        with pytest.raises(ValueError):
+            self.read_config(monkeypatch, GUNICORN_WORKER_CLASS='gevent')
+
+    def test_load_client(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        from api.management.commands.bench_server import load
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                body = b'{}' if self.path == '/ok/' else b''
+                self.send_response(200 if body else 404)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            result = load('127.0.0.1', server.server_port,
+                          [('ok', '/ok/'), ('missing', '/missing/')],
+                          concurrency=5, duration=0.5)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert result['endpoints']['ok']['requests'] > 0
+        assert 'missing' not in result['endpoints']
+        assert result['errors'] > 0, (
+            'Проверьте, что ответы с ошибкой считаются отдельно'
+        )
+        assert result['requests'] == result['endpoints']['ok']['requests']
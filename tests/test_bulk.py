@@ -0,0 +1,202 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .test_facets import assert_in_sync
+
+
+def table_queries(context, table):
+    return [query['sql'] for query in context.captured_queries
+            if f'"{table}"' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+    url = '/api/v1/titles/bulk/'
+
+    def test_create(self, admin_client, client, titles):
+        items = [
+            {'name': 'Пакетное один', 'year': 2001, 'category': 'book',
+             'genre': ['drama', 'western', 'drama']},
+            {'name': 'Из будущего', 'year': 3000, 'category': 'book',
+             'genre': ['drama']},
+            {'name': 'Без жанра', 'year': 2001, 'category': 'book',
+             'genre': ['missing']},
+            {'name': 'Пакетное два', 'year': 2002, 'category': 'movie',
+             'genre': ['comedy'], 'description': 'Описание'},
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 207, (
+            'Проверьте, что при частичном успехе пакет отвечает 207'
+        )
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            201, 400, 400, 201]
+        assert 'year' in results[1]['errors'], (
+            'Проверьте, что пакет проверяет год сериализатором произведения'
+        )
+        assert 'genre' in results[2]['errors']
+        created = results[0]['data']
+        assert created['genre'] == ['drama', 'western']
+        assert created['category'] == 'book'
+        slug_lookups = [
+            sql for sql in table_queries(context, 'reviews_genre')
+            + table_queries(context, 'reviews_category') if '."slug" IN' in sql]
+        assert len(slug_lookups) == 2, (
+            'Проверьте, что slug жанров и категорий читаются одним '
+            'запросом на пакет'
+        )
+        assert len([sql for sql in table_queries(context, 'reviews_genretitle')
+                    if sql.startswith('INSERT')]) == 1, (
+            'Проверьте, что связи с жанрами вставляются одним запросом'
+        )
+
+        detail = client.get(f'/api/v1/titles/{created["id"]}/').json()
+        assert [genre['slug'] for genre in detail['genre']] == [
+            'drama', 'western']
+        search = client.get('/api/v1/titles/', {'search': 'пакетное'}).json()
+        assert {title['name'] for title in search['results']} == {
+            'Пакетное один', 'Пакетное два'}, (
+            'Проверьте, что пакет попадает в поисковый индекс'
+        )
+        assert_in_sync()
+
+    def test_update(self, admin_client, client, titles):
+        client.get('/api/v1/titles/')
+        items = [
+            {'id': titles[0].id, 'name': 'Новое имя', 'genre': ['western']},
+            {'id': titles[1].id, 'category': 'movie'},
+            {'id': titles[2].id, 'year': 3000},
+            {'id': 0, 'name': 'Нет такого'},
+            {'id': True, 'name': 'Не id'},
+        ]
+        response = admin_client.patch(self.url, items, format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            200, 200, 400, 400, 400], (
+            'Проверьте, что true не принимается за id 1'
+        )
+        assert results[0]['data']['name'] == 'Новое имя'
+        assert results[0]['data']['genre'] == ['western']
+        assert results[1]['data']['category'] == 'movie'
+
+        listing = client.get('/api/v1/titles/', {'limit': 3}).json()
+        assert listing['results'][0]['name'] == 'Новое имя', (
+            'Проверьте, что пакетное изменение сбрасывает кэш списка'
+        )
+        assert listing['results'][2]['year'] == titles[2].year
+        search = client.get('/api/v1/titles/', {'search': 'новое'}).json()
+        assert [title['id'] for title in search['results']] == [titles[0].id]
+        assert_in_sync()
+
+    def test_update_queries(self, admin_client, titles,
+                            django_assert_num_queries):
+        def patch(batch):
+            items = [{'id': title.id, 'year': 2000, 'genre': ['western']}
+                     for title in batch]
+            response = admin_client.patch(self.url, items, format='json')
+            assert [result['status'] for result in response.json()] == [
+                200] * len(batch)
+
+        patch(titles[:1])
+        with CaptureQueriesContext(connection) as context:
+            patch(titles[1:2])
+        with django_assert_num_queries(len(context.captured_queries)):
+            patch(titles[2:8])
+        assert_in_sync()
+
+    def test_permissions_and_limits(self, user_client, admin_client,
+                                    settings):
+        item = {'name': 'Пакет', 'year': 2000, 'category': 'book',
+                'genre': []}
+        response = user_client.post(self.url, [item], format='json')
+        assert response.status_code == 403
+        response = admin_client.post(self.url, item, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что пакет ожидает список объектов'
+        )
+        settings.BULK_MAX_ITEMS = 2
+        response = admin_client.post(self.url, [item] * 3, format='json')
+        assert response.status_code == 400, (
+            'Проверьте ограничение BULK_MAX_ITEMS'
+        )
+
+
+# Версии кэша сдвигаются после фиксации транзакции записи.
+@pytest.mark.django_db(transaction=True)
+class TestBulkGenresAndReviews:
+
+    def test_genres(self, admin_client, client, genres):
+        client.get('/api/v1/genres/')
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Фантастика', 'slug': 'sci-fi'},
+            {'name': 'Повтор', 'slug': 'sci-fi'},
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Ужасы', 'slug': 'horror'},
+        ], format='json')
+        assert response.status_code == 207
+        assert [result['status'] for result in response.json()] == [
+            201, 400, 400, 201], (
+            'Проверьте, что занятый slug отклоняется, в том числе '
+            'внутри пакета'
+        )
+        slugs = [genre['slug']
+                 for genre in client.get('/api/v1/genres/').json()['results']]
+        assert {'sci-fi', 'horror'} <= set(slugs)
+
+    def test_genre_slug_race(self, admin_client, genres, monkeypatch):
+        from api.serializers import GenreSerializer
+        from reviews.models import Genre
+
+        validate_slug = GenreSerializer.validate_slug
+
+        def racing_validate_slug(serializer, value):
+            value = validate_slug(serializer, value)
+            if value == 'horror':
+                # Параллельный запрос занимает slug после проверки.
+                Genre.objects.create(name='Ужасы', slug=value)
+            return value
+
+        monkeypatch.setattr(GenreSerializer, 'validate_slug',
+                            racing_validate_slug)
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Фантастика', 'slug': 'sci-fi'},
+            {'name': 'Хоррор', 'slug': 'horror'},
+        ], format='json')
+        assert response.status_code == 207
+        assert [result['status'] for result in response.json()] == [
+            201, 400], 'Проверьте, что гонка за slug даёт 400, а не 500'
+        assert Genre.objects.filter(slug='sci-fi').exists()
+
+    def test_reviews(self, admin_client, user, another_user, admin, titles):
+        from reviews.models import Title
+
+        url = f'/api/v1/titles/{titles[0].id}/reviews/bulk/'
+        response = admin_client.post(url, [
+            {'author': user.username, 'text': 'Отзыв', 'score': 9},
+            {'author': user.username, 'text': 'Повтор', 'score': 1},
+            {'author': 'nobody', 'text': 'Отзыв', 'score': 5},
+            {'author': another_user.username, 'text': 'Отзыв', 'score': 11},
+            {'author': admin.username, 'text': 'Отзыв', 'score': 4},
+        ], format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            201, 400, 400, 400, 201]
+        assert results[0]['data']['author'] == user.username
+        assert 'score' in results[3]['errors']
+
+        title = Title.objects.get(pk=titles[0].pk)
+        assert (title.review_count, title.score_sum) == (2, 13), (
+            'Проверьте, что пакет отзывов пересчитывает рейтинг'
+        )
+        assert_in_sync()
+
+    def test_reviews_admin_only(self, user_client, user, titles):
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0].id}/reviews/bulk/',
+            [{'author': user.username, 'text': 'Отзыв', 'score': 9}],
+            format='json')
+        assert response.status_code == 403
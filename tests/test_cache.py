@@ -0,0 +1,71 @@
+import pytest
+
+
+# Версии кэша сдвигаются после фиксации транзакции записи.
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_titles_cached_until_write(self, client, admin_client, titles,
+                                       genres, categories,
+                                       django_assert_num_queries):
+        url = '/api/v1/titles/?genre=drama&limit=5'
+        first = client.get(url).json()
+        # Из базы читаются только версии пространств.
+        with django_assert_num_queries(1):
+            assert client.get(url).json() == first
+        with django_assert_num_queries(1):
+            assert client.get(
+                '/api/v1/titles/?limit=5&genre=drama&unknown=1'
+            ).json() == first, 'Проверьте нормализацию параметров запроса'
+
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Новое', 'year': 2000, 'genre': ['drama'],
+            'category': 'movie'})
+        assert response.status_code == 201
+        assert client.get(url).json()['count'] == first['count'] + 1, (
+            'Проверьте, что создание произведения сбрасывает кэш'
+        )
+
+        genre_count = client.get('/api/v1/genres/').json()['count']
+        admin_client.delete('/api/v1/genres/western/')
+        assert client.get('/api/v1/genres/').json()['count'] == (
+            genre_count - 1)
+
+    def test_links_follow_host(self, client, titles):
+        url = '/api/v1/titles/?limit=2'
+        first = client.get(url, HTTP_HOST='one.example').json()
+        assert first['next'].startswith('http://one.example/')
+        other = client.get(url, HTTP_HOST='two.example').json()
+        assert other['next'].startswith('http://two.example/'), (
+            'Проверьте, что кэш не отдаёт ссылки, собранные для другого хоста'
+        )
+
+    def test_review_invalidates_title_rating(self, client, user_client,
+                                             titles):
+        url = f'/api/v1/titles/{titles[2].id}/'
+        assert client.get(url).json()['rating'] is None
+        user_client.post(f'{url}reviews/', data={'text': 'a', 'score': 8})
+        assert client.get(url).json()['rating'] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кэш произведения'
+        )
+
+    def test_category_rename_invalidates_titles(self, client, titles):
+        from reviews.models import Category
+
+        url = f'/api/v1/titles/{titles[0].id}/'
+        client.get(url)
+        category = Category.objects.get(pk=titles[0].category_id)
+        category.name = 'Кино'
+        category.save()
+        assert client.get(url).json()['category']['name'] == 'Кино'
+
+    def test_stats(self, client, admin_client, user_client, titles):
+        from api.cache import stats
+
+        stats.reset()
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/categories/')
+        assert user_client.get('/api/v1/cache/stats/').status_code == 403
+        data = admin_client.get('/api/v1/cache/stats/').json()
+        assert (data['hits'], data['misses']) == (1, 1)
+        assert data['stored_bytes'] > 0
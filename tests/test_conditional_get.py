@@ -0,0 +1,139 @@
+import pytest
+
+
+# Версии кэша сдвигаются после фиксации транзакции записи.
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGet:
+
+    def _assert_not_modified(self, client, url, django_assert_num_queries,
+                             queries=1):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        # Версии пространств, для отзывов и комментариев ещё и родитель.
+        with django_assert_num_queries(queries):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что неизменённые данные отдаются с кодом 304'
+        )
+        return etag
+
+    def test_titles(self, client, admin_client, titles,
+                    django_assert_num_queries):
+        url = '/api/v1/titles/?genre=drama'
+        etag = self._assert_not_modified(client, url,
+                                         django_assert_num_queries)
+        last_modified = client.get(url)['Last-Modified']
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+        admin_client.patch(f'/api/v1/titles/{titles[0].id}/',
+                           data={'name': 'Новое название'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение произведения меняет ETag'
+        )
+        assert response['ETag'] != etag
+
+    def test_reviews_and_comments(self, client, user_client, reviews,
+                                  django_assert_num_queries):
+        review = reviews[0]
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        reviews_etag = self._assert_not_modified(
+            client, reviews_url, django_assert_num_queries, 2)
+        comments_etag = self._assert_not_modified(
+            client, comments_url, django_assert_num_queries, 2)
+        other_etag = client.get(
+            f'/api/v1/titles/{reviews[2].title_id}/reviews/')['ETag']
+
+        user_client.post(comments_url, data={'text': 'Комментарий'})
+        assert client.get(
+            comments_url, HTTP_IF_NONE_MATCH=comments_etag
+        ).status_code == 200
+        assert client.get(
+            reviews_url, HTTP_IF_NONE_MATCH=reviews_etag
+        ).status_code == 304, 'Комментарий не меняет список отзывов'
+
+        user_client.patch(f'{reviews_url}{review.id}/', data={'score': 1})
+        assert client.get(
+            reviews_url, HTTP_IF_NONE_MATCH=reviews_etag
+        ).status_code == 200
+        assert client.get(
+            f'/api/v1/titles/{reviews[2].title_id}/reviews/',
+            HTTP_IF_NONE_MATCH=other_etag
+        ).status_code == 304, 'Отзыв к другому произведению не меняет ETag'
+
+    def test_author_renamed(self, client, reviews):
+        review = reviews[0]
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = client.get(url)['ETag']
+        review.author.username = 'renamed'
+        review.author.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что смена имени автора меняет ETag отзывов'
+        )
+
+    def test_missing_parent(self, client, reviews):
+        from django.utils.http import http_date
+        from reviews.models import CacheVersion
+
+        CacheVersion.objects.bump(CacheVersion.CATALOGUE)
+        missing = f'/api/v1/titles/{reviews[0].title_id + 1000}/reviews/'
+        response = client.get(missing, HTTP_IF_MODIFIED_SINCE=http_date())
+        assert response.status_code == 404, (
+            'Проверьте, что для несуществующего родителя ответ 404'
+        )
+
+    def test_versions_shared(self, client, titles):
+        from django.core.cache import cache
+
+        url = '/api/v1/titles/'
+        etag = client.get(url)['ETag']
+        # Версии в базе: кэш другого процесса или пода их не подменит.
+        cache.clear()
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    def test_versions_bumped_after_commit(self, categories):
+        from django.db import transaction
+        from reviews.models import CacheVersion
+
+        def version():
+            return CacheVersion.objects.filter(
+                namespace='titles').values_list('version', flat=True).first()
+
+        before = version()
+        with transaction.atomic():
+            categories[0].name = 'Кино'
+            categories[0].save()
+            assert version() == before, (
+                'Проверьте, что версия не меняется внутри транзакции записи'
+            )
+        assert version() == (before or 0) + 1
+
+    def test_versions_of_deleted_parents_pruned(self, admin_client,
+                                                user_client, titles, reviews):
+        from reviews.models import CacheVersion
+
+        def namespaces():
+            return set(CacheVersion.objects.values_list(
+                'namespace', flat=True))
+
+        review = reviews[0]
+        assert f'comments:{review.pk}' not in namespaces(), (
+            'Проверьте, что новый отзыв не заводит строку версии'
+        )
+        user_client.post(f'/api/v1/titles/{review.title_id}/reviews/'
+                         f'{review.pk}/comments/', data={'text': 'Да'})
+        assert f'comments:{review.pk}' in namespaces()
+        admin_client.delete(f'/api/v1/titles/{review.title_id}/reviews/'
+                            f'{review.pk}/')
+        assert f'comments:{review.pk}' not in namespaces(), (
+            'Проверьте, что версии комментариев удалённого отзыва удаляются'
+        )
+        assert f'reviews:{review.title_id}' in namespaces()
+        admin_client.delete(f'/api/v1/titles/{review.title_id}/')
+        assert f'reviews:{review.title_id}' not in namespaces(), (
+            'Проверьте, что версии отзывов удалённого произведения удаляются'
+        )
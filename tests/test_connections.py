@@ -0,0 +1,113 @@
+import pytest
+from django.db import connection
+
+
+@pytest.mark.django_db
+class TestConnectionStats:
+
+    def test_requests_and_connections(self, admin_client, client, titles):
+        from api.connections import stats
+
+        stats.reset()
+        for _ in range(3):
+            assert client.get('/api/v1/categories/').status_code == 200
+        fresh = connection.copy()
+        fresh.ensure_connection()
+        fresh.close()
+        data = admin_client.get('/api/v1/db/stats/').json()
+        assert data['requests'] == 3, (
+            'Проверьте, что обслуженные запросы считаются'
+        )
+        assert data['connections_opened'] == 1, (
+            'Проверьте, что открытые соединения считаются'
+        )
+        assert data['connections_per_request'] == pytest.approx(1 / 3)
+
+    def test_pool_checkouts(self, monkeypatch):
+        from api.connections import stats
+        from django.db import connections
+
+        class Pool:
+            opened = 1
+
+            def as_dict(self):
+                return {'opened': self.opened}
+
+        class PooledConnection:
+            alias = 'pooled'
+            pool = Pool()
+
+            def get_pool(self):
+                return self.pool
+
+        pooled = PooledConnection()
+        monkeypatch.setattr(connections, 'all', lambda: [pooled])
+        stats.reset()
+        for _ in range(3):
+            stats.connection_opened(pooled)
+        pooled.pool.opened += 1
+        data = stats.as_dict()
+        assert data['connections_opened'] == 1, (
+            'Проверьте, что выдача соединения из пула не считается открытием'
+        )
+        assert data['pools'] == {'pooled': {'opened': 2}}
+
+    def test_admin_only(self, user_client):
+        assert user_client.get('/api/v1/db/stats/').status_code == 403
+
+
+@pytest.mark.django_db(transaction=True)
+class TestHealthChecks:
+
+    @pytest.fixture
+    def checked(self, monkeypatch):
+        from django.db import connections
+
+        fresh = connection.copy()
+        fresh.settings_dict = dict(fresh.settings_dict,
+                                   CONN_HEALTH_CHECKS=True)
+        fresh.ensure_connection()
+        monkeypatch.setattr(connections, 'all', lambda: [fresh])
+        yield fresh
+        type(fresh).close(fresh)
+
+    def test_unusable_connection_closed(self, checked, monkeypatch):
+        from api.connections import check_connections
+
+        closed = []
+        monkeypatch.setattr(checked, 'close', lambda: closed.append(1))
+        check_connections()
+        assert not closed, (
+            'Проверьте, что рабочее соединение не закрывается'
+        )
+        monkeypatch.setattr(checked, 'is_usable', lambda: False)
+        check_connections()
+        assert closed, (
+            'Проверьте, что оборванное соединение закрывается до запроса'
+        )
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='Пул соединений работает только с PostgreSQL')
+@pytest.mark.django_db(transaction=True)
+def test_pool_bounds_connections(settings):
+    import threading
+
+    from api_yamdb.db.postgresql_pool.base import DatabaseWrapper
+
+    settings_dict = dict(connection.settings_dict, POOL_MAX_SIZE=2,
+                         POOL_TIMEOUT=5, CONN_MAX_AGE=0)
+    wrapper = DatabaseWrapper(settings_dict, alias='pool-test')
+
+    def query():
+        thread_wrapper = DatabaseWrapper(settings_dict, alias='pool-test')
+        with thread_wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_sleep(0.05)')
+        thread_wrapper.close()
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert wrapper.get_pool().as_dict()['opened'] <= 2
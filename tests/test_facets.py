@@ -0,0 +1,140 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+def title_counts(model, relation):
+    from django.db.models import Count
+
+    actual = dict(model.objects.values_list('slug', 'title_count'))
+    expected = dict(model.objects.annotate(value=Count(relation))
+                    .values_list('slug', 'value'))
+    return actual, expected
+
+
+def histograms():
+    from django.db.models import Count
+    from reviews.models import Review, TitleScore
+
+    actual = {(title, score): count for title, score, count
+              in TitleScore.objects.filter(count__gt=0)
+              .values_list('title', 'score', 'count')}
+    expected = {(row['title'], row['score']): row['value'] for row
+                in Review.objects.order_by().values('title', 'score')
+                .annotate(value=Count('id'))}
+    return actual, expected
+
+
+def assert_in_sync():
+    from reviews.models import Category, Genre
+
+    actual, expected = title_counts(Category, 'titles')
+    assert actual == expected, (
+        'Проверьте, что число произведений в категориях поддерживается '
+        'при записи произведений'
+    )
+    actual, expected = title_counts(Genre, 'genre')
+    assert actual == expected, (
+        'Проверьте, что число произведений в жанрах поддерживается '
+        'при записи связей GenreTitle'
+    )
+    actual, expected = histograms()
+    assert actual == expected, (
+        'Проверьте, что распределение оценок поддерживается при записи отзывов'
+    )
+
+
+@pytest.mark.django_db
+class TestFacets:
+
+    def test_genre_and_category_facets(self, client, titles):
+        response = client.get('/api/v1/genres/facets/')
+        assert response.status_code == 200
+        assert response.json() == [
+            {'name': 'Драма', 'slug': 'drama', 'title_count': 12},
+            {'name': 'Комедия', 'slug': 'comedy', 'title_count': 8},
+            {'name': 'Вестерн', 'slug': 'western', 'title_count': 4},
+        ]
+        response = client.get('/api/v1/categories/facets/')
+        assert response.status_code == 200
+        assert {row['slug']: row['title_count']
+                for row in response.json()} == {'movie': 6, 'book': 6}
+
+    def test_title_counts_follow_writes(self, admin_client, titles, genres,
+                                        categories):
+        from reviews.models import GenreTitle, Title
+
+        titles[0].genre.remove(genres[0])
+        titles[1].genre.clear()
+        titles[2].genre.add(genres[0])
+        genres[2].title_set.add(titles[3], titles[4])
+        GenreTitle.objects.create(title=titles[5], genre=genres[2])
+        link = GenreTitle.objects.filter(title=titles[6]).first()
+        link.genre = genres[1]
+        link.save()
+        titles[7].category = categories[0]
+        titles[7].save()
+        titles[8].delete()
+        Title.objects.create(name='Новое', year=2000, category=categories[1])
+        assert_in_sync()
+
+        response = admin_client.post('/api/v1/titles/', {
+            'name': 'Через API', 'year': 2000, 'category': 'book',
+            'genre': ['western', 'comedy']})
+        assert response.status_code == 201
+        assert_in_sync()
+        response = admin_client.patch(
+            f'/api/v1/titles/{response.json()["id"]}/',
+            {'category': 'movie', 'genre': ['drama']}, format='json')
+        assert response.status_code == 200
+        assert_in_sync()
+
+    def test_scores(self, client, user_client, titles, reviews):
+        response = client.get(f'/api/v1/titles/{titles[0].id}/scores/')
+        assert response.status_code == 200
+        scores = dict.fromkeys(map(str, range(1, 11)), 0)
+        assert response.json() == {
+            'id': titles[0].id, 'review_count': 2,
+            'scores': {**scores, '10': 1, '5': 1}}
+
+        response = user_client.patch(
+            f'/api/v1/titles/{titles[0].id}/reviews/{reviews[0].id}/',
+            {'score': 5})
+        assert response.status_code == 200
+        response = client.get(f'/api/v1/titles/{titles[0].id}/scores/')
+        assert response.json()['scores'] == {**scores, '5': 2}, (
+            'Проверьте, что изменение оценки переносит отзыв в распределении'
+        )
+
+        reviews[2].delete()
+        reviews[1].title = titles[2]
+        reviews[1].save()
+        response = user_client.post(
+            f'/api/v1/titles/{titles[3].id}/reviews/',
+            {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert_in_sync()
+        titles[2].delete()
+        assert_in_sync()
+
+        response = client.get(f'/api/v1/titles/{titles[4].id}/scores/')
+        assert response.json() == {
+            'id': titles[4].id, 'review_count': 0, 'scores': scores}
+        assert client.get('/api/v1/titles/0/scores/').status_code == 404
+
+    def test_constant_queries(self, client, titles, reviews,
+                              django_assert_num_queries):
+        with django_assert_num_queries(1):
+            client.get('/api/v1/genres/facets/')
+        with django_assert_num_queries(2):
+            client.get(f'/api/v1/titles/{titles[0].id}/scores/')
+
+    def test_rebuild_facets(self, titles, reviews):
+        from reviews.models import Category, Genre, TitleScore
+
+        Category.objects.update(title_count=0)
+        Genre.objects.update(title_count=100)
+        TitleScore.objects.all().delete()
+        call_command('rebuild_facets', stdout=StringIO())
+        assert_in_sync()
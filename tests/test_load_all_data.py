@@ -0,0 +1,52 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestLoadAllData:
+
+    def test_load_all_data(self):
+        from django.db.models import Count, Sum
+        from reviews.models import Comments, GenreTitle, Review, Title, User
+
+        out = StringIO()
+        call_command('load_all_data', batch_size=7, stdout=out)
+        assert 'строк/с' in out.getvalue()
+        assert User.objects.count() == 5
+        assert Title.objects.count() == 32
+        assert GenreTitle.objects.count() == 42
+        assert Review.objects.count() == 72
+        assert Comments.objects.count() == 3
+
+        title = Title.objects.get(pk=1)
+        scores = Review.objects.filter(title=title).aggregate(
+            total=Sum('score'), count=Count('id'))
+        expected = ((2 * scores['total'] + scores['count'])
+                    // (2 * scores['count']))
+        assert title.rating == expected, (
+            'Проверьте, что после загрузки пересчитывается рейтинг'
+        )
+        assert Review.objects.get(pk=1).pub_date.isoformat() == (
+            '2019-09-24T21:08:21.567000+00:00'), (
+            'Проверьте, что даты отзывов берутся из файла'
+        )
+        assert Review._meta.get_field('pub_date').auto_now_add, (
+            'Проверьте, что загрузка не меняет поле модели'
+        )
+
+        call_command('load_all_data', ignore_conflicts=True,
+                     only=['titles', 'review'], stdout=out)
+        assert Title.objects.count() == 32
+        assert Review.objects.count() == 72
+
+    def test_copy_falls_back_to_bulk(self):
+        from reviews.models import Review
+
+        out = StringIO()
+        call_command('load_all_data', copy=True, stdout=out)
+        assert 'пакетная вставка' in out.getvalue(), (
+            'Проверьте, что без PostgreSQL --copy переходит на bulk_create'
+        )
+        assert Review.objects.count() == 72
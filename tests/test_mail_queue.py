@@ -0,0 +1,104 @@
+import threading
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+
+
+class SlowBackend(EmailBackend):
+    """Почтовый сервер, который не отвечает, пока тест его не отпустит."""
+    release = threading.Event()
+    timeout = 5
+    timed_out = False
+    connections = 0
+    lock = threading.Lock()
+
+    def send_messages(self, messages):
+        with self.lock:
+            SlowBackend.connections += 1
+        if not self.release.wait(self.timeout):
+            SlowBackend.timed_out = True
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+
+    def test_signup_does_not_wait_for_mail(self, client, settings):
+        from api.mail import mail_queue
+
+        settings.EMAIL_BACKEND = 'tests.test_mail_queue.SlowBackend'
+        SlowBackend.connections = 0
+        SlowBackend.timed_out = False
+        SlowBackend.release.clear()
+        try:
+            for number in range(3):
+                response = client.post('/api/v1/auth/signup/', data={
+                    'username': f'reader{number}',
+                    'email': f'reader{number}@yamdb.fake'})
+                assert response.status_code == 200
+            assert mail.outbox == [], (
+                'Проверьте, что регистрация не ждёт отправки письма'
+            )
+        finally:
+            SlowBackend.release.set()
+        mail_queue.flush()
+        assert not SlowBackend.timed_out, (
+            'Проверьте, что регистрация не ждёт отправки письма'
+        )
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            f'reader{number}@yamdb.fake' for number in range(3)]
+        assert SlowBackend.connections < 3, (
+            'Проверьте, что письма отправляются пачками'
+        )
+
+    def test_durable_outbox(self, settings,
+                            django_capture_on_commit_callbacks):
+        from api.mail import mail_queue
+        from reviews.models import MailOutbox
+
+        settings.MAIL_QUEUE_DURABLE = True
+        with django_capture_on_commit_callbacks() as callbacks:
+            mail_queue.send_mail('тема', 'код', ['outbox@yamdb.fake'])
+        assert len(callbacks) == 1
+        assert MailOutbox.objects.filter(sent=None).count() == 1
+        # Пачку из очереди отправляем здесь же, как это сделал бы поток.
+        row = MailOutbox.objects.get()
+        assert mail_queue.deliver([row.pk]) == 1
+        assert MailOutbox.objects.filter(sent=None).count() == 0
+        stdout = StringIO()
+        call_command('send_outbox', stdout=stdout)
+        assert 'Отправлено писем: 0' in stdout.getvalue()
+        assert [message.to for message in mail.outbox] == [
+            ['outbox@yamdb.fake']], (
+            'Проверьте, что письмо из MailOutbox отправляется один раз'
+        )
+
+    def test_send_outbox_skips_claimed(self, settings):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from reviews.models import MailOutbox
+
+        now = timezone.now()
+        # Письма упавшего процесса: одно не взято, другое взято давно.
+        MailOutbox.objects.create(subject='тема', message='код',
+                                  recipients='lost@yamdb.fake')
+        MailOutbox.objects.create(
+            subject='тема', message='код', recipients='stale@yamdb.fake',
+            claimed=now - timedelta(
+                seconds=settings.MAIL_OUTBOX_CLAIM_TIMEOUT + 1),
+            claimed_by='crashed')
+        # Это письмо сейчас отправляет очередь другого процесса.
+        MailOutbox.objects.create(
+            subject='тема', message='код', recipients='busy@yamdb.fake',
+            claimed=now, claimed_by='worker')
+        call_command('send_outbox', stdout=StringIO())
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            'lost@yamdb.fake', 'stale@yamdb.fake'], (
+            'Проверьте, что send_outbox не отправляет взятые письма'
+        )
+        assert list(MailOutbox.objects.filter(sent=None).values_list(
+            'recipients', flat=True)) == ['busy@yamdb.fake']
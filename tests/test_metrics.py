@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+
+import pytest
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_DIR = str(tmp_path)
+    return tmp_path
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def hit_cache(ready, release):
+    from api import metrics
+
+    for _ in range(5):
+        metrics.CACHE_HITS.inc()
+    metrics.MAIL_QUEUE_DEPTH.set(7)
+    ready.set()
+    release.wait(10)
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_scrape(self, metrics_dir, client, user_client, titles):
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{titles[0].id}/')
+        client.get(f'/api/v1/titles/{titles[0].id}/')
+        client.get('/api/v1/missing/')
+        client.generic('PROPFIND', '/api/v1/categories/')
+        user_client.get('/api/v1/users/me/')
+        samples = scrape(client)
+        assert samples[
+            'yamdb_http_requests_total'
+            '{route="categories",method="other",status="401"}'] == 1, (
+            'Проверьте, что неизвестные методы не заводят новых серий'
+        )
+        assert samples[
+            'yamdb_http_request_duration_seconds_count'
+            '{route="titles",method="GET"}'] == 5, (
+            'Проверьте, что время запросов собирается по basename маршрута'
+        )
+        assert samples[
+            'yamdb_http_request_duration_seconds_bucket'
+            '{route="titles",method="GET",le="+Inf"}'] == 5
+        assert samples[
+            'yamdb_http_requests_total'
+            '{route="users",method="GET",status="200"}'] == 1
+        assert samples[
+            'yamdb_http_requests_total'
+            '{route="unresolved",method="GET",status="404"}'] == 1
+        assert samples['yamdb_db_queries_per_request_count{route="titles"}'] == 5
+        assert samples['yamdb_db_queries_per_request_sum{route="titles"}'] > 0
+        assert samples['yamdb_db_duration_seconds_count{route="titles"}'] == 5
+        assert samples['yamdb_cache_hits_total'] >= 1
+        assert samples['yamdb_cache_misses_total'] >= 1
+        assert samples['yamdb_auth_duration_seconds_count'] >= 1
+        assert samples['yamdb_render_duration_seconds_count'] >= 5
+        assert samples['yamdb_mail_outbox_pending'] == 0
+        assert samples['yamdb_mail_queue_depth'] == 0
+
+    def test_processes(self, metrics_dir, client):
+        from api import metrics
+
+        metrics.CACHE_HITS.inc(2)
+        metrics.MAIL_QUEUE_DEPTH.set(1)
+        context = multiprocessing.get_context('fork')
+        ready, release = context.Event(), context.Event()
+        worker = context.Process(target=hit_cache, args=(ready, release))
+        worker.start()
+        try:
+            assert ready.wait(10)
+            samples = scrape(client)
+            assert samples['yamdb_cache_hits_total'] == 7, (
+                'Проверьте, что счётчики складываются по процессам'
+            )
+            assert samples['yamdb_mail_queue_depth'] == 8
+        finally:
+            release.set()
+            worker.join(10)
+        samples = scrape(client)
+        assert samples['yamdb_cache_hits_total'] == 7, (
+            'Проверьте, что счётчики завершившихся процессов сохраняются'
+        )
+        assert samples['yamdb_mail_queue_depth'] == 1, (
+            'Проверьте, что значения завершившихся процессов не учитываются'
+        )
+        names = sorted(path.name for path in metrics_dir.glob('*.db'))
+        assert names == sorted(['counter_archive.db',
+                                f'counter_{os.getpid()}.db',
+                                f'gauge_{os.getpid()}.db']), (
+            'Проверьте, что файлы завершившихся процессов уходят в архив'
+        )
+
+    def test_archive(self, metrics_dir):
+        from api.metrics import ValueFile, mark_process_dead, read_values
+
+        for pid, amount in ((101, 1), (102, 2)):
+            values = ValueFile(str(metrics_dir / f'counter_{pid}.db'))
+            values.add('общий', amount)
+            values.add(f'ключ-{pid}', amount)
+            values.close()
+            mark_process_dead(pid)
+            mark_process_dead(pid)
+        assert [path.name for path in metrics_dir.glob('*.db')] == [
+            'counter_archive.db']
+        assert dict(read_values(str(metrics_dir / 'counter_archive.db'))) == {
+            'общий': 3.0, 'ключ-101': 1.0, 'ключ-102': 2.0}
+
+    def test_value_file(self, metrics_dir):
+        from api.metrics import INITIAL_SIZE, ValueFile, read_values
+
+        path = str(metrics_dir / 'counter_1.db')
+        values = ValueFile(path)
+        keys = [f'ключ-{number}' * (number % 5 + 1) for number in range(3000)]
+        for number, key in enumerate(keys):
+            values.add(key, number)
+        values.add(keys[0], 2.5)
+        assert values.capacity > INITIAL_SIZE
+        expected = {key: float(number) for number, key in enumerate(keys)}
+        expected[keys[0]] = 2.5
+        assert dict(read_values(path)) == expected, (
+            'Проверьте, что записи читаются после роста файла'
+        )
+        reopened = ValueFile(path)
+        reopened.add(keys[1], 1)
+        assert dict(read_values(path))[keys[1]] == 2.0
+
+    def test_disabled(self, metrics_dir, settings, client, titles):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        from api.metrics import MetricsMiddleware
+
+        settings.METRICS_ENABLED = False
+        with pytest.raises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
+        client.get(f'/api/v1/titles/{titles[0].id}/')
+        assert not list(metrics_dir.iterdir()), (
+            'Проверьте, что без METRICS_ENABLED файлы метрик не пишутся'
+        )
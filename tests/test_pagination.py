@@ -0,0 +1,130 @@
+import base64
+import datetime
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from django.utils import timezone
+
+
+@pytest.fixture
+def many_reviews(titles, django_user_model):
+    from reviews.models import Review
+
+    title = titles[0]
+    moment = timezone.make_aware(datetime.datetime(2020, 1, 1))
+    for number in range(25):
+        author = django_user_model.objects.create_user(
+            username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+        Review.objects.create(title=title, author=author,
+                              text=f'Отзыв {number}', score=number % 10 + 1)
+    # Одинаковые даты проверяют, что id разрешает равенство ключей.
+    Review.objects.filter(pk__in=Review.objects.filter(
+        title=title).values('pk')[:10]).update(pub_date=moment)
+    return title
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def _walk(self, client, url, key):
+        seen = []
+        pages = []
+        while url:
+            body = client.get(url).json()
+            assert 'count' not in body, (
+                'Проверьте, что в режиме курсора не выполняется COUNT'
+            )
+            pages.append(body)
+            seen.extend(item['id'] for item in body['results'])
+            url = body[key]
+        return seen, pages
+
+    def test_reviews_cursor_walk(self, client, many_reviews):
+        from reviews.models import Review
+
+        expected = list(Review.objects.filter(title=many_reviews)
+                        .order_by('-pub_date', '-id')
+                        .values_list('id', flat=True))
+        url = f'/api/v1/titles/{many_reviews.id}/reviews/?cursor=&limit=7'
+        seen, pages = self._walk(client, url, 'next')
+        assert seen == expected, (
+            'Проверьте, что курсор обходит отзывы без пропусков и повторов'
+        )
+        assert pages[0]['previous'] is None
+
+        _, back_pages = self._walk(client, pages[-1]['previous'], 'previous')
+        assert [page['results'] for page in reversed(back_pages)] == [
+            page['results'] for page in pages[:-1]
+        ], 'Проверьте, что ссылка previous возвращает те же страницы'
+
+    def test_comments_and_titles_cursor(self, client, titles, reviews, user):
+        from reviews.models import Comments
+
+        review = reviews[0]
+        for number in range(5):
+            Comments.objects.create(review=review, author=user,
+                                    text=f'Комментарий {number}')
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.id}'
+               '/comments/?cursor=&limit=2')
+        seen, _ = self._walk(client, url, 'next')
+        assert seen == list(Comments.objects.order_by('pub_date', 'id')
+                            .values_list('id', flat=True))
+
+        seen, _ = self._walk(client, '/api/v1/titles/?cursor=&limit=5',
+                             'next')
+        assert seen == sorted(title.id for title in titles)
+
+    def test_deep_page_queries(self, client, many_reviews):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = f'/api/v1/titles/{many_reviews.id}/reviews/?cursor=&limit=5'
+        counts = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                url = client.get(url).json()['next']
+            assert not any('COUNT(' in query['sql']
+                           for query in context.captured_queries)
+            counts.append(len(context.captured_queries))
+        assert len(set(counts)) == 1, (
+            'Проверьте, что глубокие страницы стоят столько же, сколько первая'
+        )
+
+    def test_invalid_cursor(self, client, titles):
+        response = client.get('/api/v1/titles/?cursor=bm9wZQ')
+        assert response.status_code == 404
+
+    def test_malformed_cursor_values(self, client, titles, reviews, user):
+        from reviews.models import Comments
+
+        review = reviews[0]
+        for number in range(2):
+            Comments.objects.create(review=review, author=user,
+                                    text=f'Комментарий {number}')
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        urls = [
+            '/api/v1/titles/?cursor=&limit=1',
+            '/api/v1/titles/?ordering=rating&cursor=&limit=1',
+            '/api/v1/titles/?ordering=-rating&cursor=&limit=1',
+            '/api/v1/titles/?search=произведение&cursor=&limit=1',
+            f'{reviews_url}?cursor=&limit=1',
+            f'{reviews_url}{review.id}/comments/?cursor=&limit=1',
+        ]
+        for url in urls:
+            next_url = client.get(url).json()['next']
+            query = parse_qs(urlsplit(next_url).query)
+            values = json.loads(
+                base64.urlsafe_b64decode(query['cursor'][0]))['v']
+            for position in range(len(values)):
+                for bad in ('x', [1], {'a': 1}):
+                    payload = {'v': [*values[:position], bad,
+                                     *values[position + 1:]], 'r': 0}
+                    bad_cursor = base64.urlsafe_b64encode(
+                        json.dumps(payload).encode()).decode()
+                    response = client.get(urlsplit(next_url).path, {
+                        **query, 'cursor': bad_cursor})
+                    assert response.status_code == 404, (
+                        f'Проверьте, что курсор {payload} для {url} '
+                        'даёт 404, а не ошибку сервера'
+                    )
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def profile_stats():
+    from api.profiling import stats
+
+    stats.reset()
+    yield stats
+    stats.reset()
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_DUMP_INTERVAL = 0
+    return settings
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_disabled_by_default(self, client, admin_client, titles):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        from api.profiling import ProfilingMiddleware
+
+        with pytest.raises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+        client.get('/api/v1/titles/')
+        response = admin_client.get('/api/v1/profiling/stats/')
+        assert response.status_code == 200
+        assert response.json()['routes'] == {}, (
+            'Проверьте, что без PROFILING_ENABLED запросы не учитываются'
+        )
+
+    def test_routes(self, profiling, client, admin_client, user_client,
+                    titles):
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{titles[0].id}/')
+        client.get('/api/v1/missing/')
+        user_client.get('/api/v1/users/me/')
+        report = admin_client.get('/api/v1/profiling/stats/').json()
+        routes = report['routes']
+        assert routes['GET titles-list']['requests'] == 3
+        assert routes['GET titles-detail']['requests'] == 1
+        assert routes['GET users-current_user_info']['requests'] == 1
+        assert 'GET unresolved' in routes
+        titles_list = routes['GET titles-list']
+        assert titles_list['mean_queries'] > 0
+        assert titles_list['mean_response_bytes'] > 0
+        assert 0 <= titles_list['mean_db_ms'] <= titles_list['max_wall_ms']
+
+        assert user_client.get(
+            '/api/v1/profiling/stats/').status_code == 403
+        assert admin_client.delete(
+            '/api/v1/profiling/stats/').status_code == 204
+        assert list(admin_client.get(
+            '/api/v1/profiling/stats/').json()['routes']) == [
+            'DELETE profiling_stats'], 'Проверьте, что DELETE обнуляет сводку'
+
+    def test_duplicate_queries(self, titles):
+        from django.db import connection
+        from reviews.models import Title
+
+        from api.profiling import QueryRecorder
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for title in titles[:3]:
+                Title.objects.get(pk=title.pk)
+            list(Title.objects.filter(pk__in=[title.pk for title in titles]))
+        assert (recorder.count, recorder.duplicates) == (4, 2), (
+            'Проверьте, что повторы одного шаблона SQL считаются дублями'
+        )
+
+    def test_slow_profiles_and_dump(self, profiling, client, titles,
+                                    tmp_path, profile_stats):
+        profiling.PROFILING_SAMPLE_RATE = 1
+        profiling.PROFILING_SLOW_MS = 0
+        profiling.PROFILING_KEEP_PROFILES = 2
+        profiling.PROFILING_DUMP_INTERVAL = 1e-9
+        profiling.PROFILING_DUMP_PATH = os.path.join(
+            tmp_path, 'profile-{pid}.json')
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        profiles = profile_stats.as_dict()['slow_profiles']
+        assert len(profiles) == 2, (
+            'Проверьте, что хранятся PROFILING_KEEP_PROFILES профилей'
+        )
+        assert profiles[0]['wall_ms'] >= profiles[1]['wall_ms']
+        assert 'function calls' in profiles[0]['stats']
+        with open(os.path.join(tmp_path, f'profile-{os.getpid()}.json'),
+                  encoding='utf8') as dump:
+            assert json.load(dump)['routes']['GET titles-list'][
+                'requests'] == 3, 'Проверьте периодическую выгрузку сводки'
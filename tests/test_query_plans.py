@@ -0,0 +1,141 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.management.commands.generate_data import generate_rows
+from reviews.management.commands.load_all_data import SOURCES, bulk_load
+from reviews.models import Title
+
+# Таблицы, которые растут вместе с каталогом: полный проход по ним
+# на отфильтрованных путях означает потерянный индекс.
+LARGE_TABLES = ('reviews_title', 'reviews_genretitle', 'reviews_review',
+                'reviews_comments', 'reviews_titletoken')
+
+
+@pytest.fixture
+def catalogue(django_db_blocker):
+    rows = generate_rows(users=50, titles=2000, reviews=5000,
+                         comments=5000, seed=7)
+    for name, model, _, from_row in SOURCES:
+        bulk_load(model, from_row, rows[name], 1000)
+    Title.objects.rebuild_ratings()
+    Title.objects.rebuild_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return rows
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Без последовательного чтения планировщик выберет индекс,
+            # если он вообще подходит к запросу.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = [row[0] for row in cursor.fetchall()]
+            cursor.execute('RESET enable_seqscan')
+            return plan
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Большие таблицы, которые план читает целиком."""
+    if connection.vendor == 'postgresql':
+        pattern = r'Seq Scan on (\w+)'
+    else:
+        # SCAN без USING INDEX — чтение всей таблицы, SEARCH — поиск
+        # по индексу.
+        pattern = r'^SCAN (?:TABLE )?(\w+)$'
+    tables = {match.group(1) for line in plan
+              for match in [re.search(pattern, line.strip())] if match}
+    return tables & set(LARGE_TABLES)
+
+
+def sorts(plan):
+    """Шаги плана, сортирующие строки вместо чтения индекса по порядку."""
+    if connection.vendor == 'postgresql':
+        pattern = r'^(?:->\s*)?Sort\b'
+    else:
+        pattern = r'USE TEMP B-TREE FOR ORDER BY'
+    return [line for line in plan if re.search(pattern, line.strip())]
+
+
+def endpoint_plans(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, f'{url} вернул {response.status_code}'
+    return response, [(query['sql'], explain(query['sql']))
+                      for query in context.captured_queries]
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    def urls(self, rows):
+        title_id = rows['review'][0]['title_id']
+        review_id = next(row['review_id'] for row in rows['comments']
+                         if row['review_id'] in {
+                             review['id'] for review in rows['review']
+                             if review['title_id'] == title_id})
+        reviews = f'/api/v1/titles/{title_id}/reviews/'
+        comments = f'{reviews}{review_id}/comments/'
+        return [
+            '/api/v1/titles/?year=1990',
+            f'/api/v1/titles/?name={rows["titles"][5]["name"]}',
+            '/api/v1/titles/?genre=genre-3',
+            '/api/v1/titles/?category=category-2',
+            '/api/v1/titles/?genre=genre-1&category=category-1&year=2000',
+            f'/api/v1/titles/?search={rows["titles"][5]["name"]}',
+            '/api/v1/titles/?search=произведение 12&cursor=',
+            '/api/v1/titles/autocomplete/?q=произведение 12',
+            '/api/v1/titles/?min_rating=8&max_rating=9',
+            '/api/v1/titles/?genre=genre-3&min_rating=8&ordering=-rating',
+            '/api/v1/titles/?ordering=-rating&cursor=',
+            '/api/v1/titles/?ordering=rating&cursor=',
+            f'/api/v1/titles/{title_id}/',
+            reviews,
+            f'{reviews}?offset=20',
+            f'{reviews}?cursor=',
+            f'{reviews}{review_id}/',
+            comments,
+            f'{comments}?cursor=',
+        ]
+
+    def test_no_full_scans(self, client, catalogue):
+        for url in self.urls(catalogue):
+            _, plans = endpoint_plans(client, url)
+            for sql, plan in plans:
+                assert not full_scans(plan), (
+                    f'Запрос {url} читает таблицу целиком, проверьте '
+                    f'индексы:\n{sql}\n' + '\n'.join(plan)
+                )
+
+    def test_keyset_pages_read_index_in_order(self, client, catalogue):
+        for url in self.urls(catalogue):
+            # Релевантности поиска в индексе нет, её страницы сортируются.
+            if 'cursor=' not in url or 'search=' in url:
+                continue
+            response, _ = endpoint_plans(client, url)
+            _, plans = endpoint_plans(client, response.json()['next'])
+            for sql, plan in plans:
+                assert not sorts(plan), (
+                    f'Страница {url} сортируется без индекса:\n{sql}\n'
+                    + '\n'.join(plan)
+                )
+
+    def test_autocomplete_reads_window_in_index_order(self, client,
+                                                      catalogue):
+        for query in ('произв', 'произведение 1'):
+            url = f'/api/v1/titles/autocomplete/?q={query}'
+            _, plans = endpoint_plans(client, url)
+            sql, plan = next((sql, plan) for sql, plan in plans
+                             if 'reviews_titletoken' in sql)
+            assert 'LIMIT 200' in sql, (
+                f'Проверьте, что {url} читает не больше окна совпадений'
+            )
+            assert not sorts(plan), (
+                f'Окно подсказок {url} сортируется без индекса:\n{sql}\n'
+                + '\n'.join(plan)
+            )
@@ -0,0 +1,113 @@
+import datetime
+import decimal
+import uuid
+from collections import OrderedDict
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+SAMPLES = [
+    {'id': 1, 'name': 'Произведение', 'rating': None, 'genre': []},
+    [OrderedDict([('b', 1), ('a', [1.5, True, None])])],
+    {1: 'ключ-число', 'line': 'строка абзац конец'},
+    {'pub_date': datetime.datetime(2021, 5, 1, 12, 30, 15, 123456,
+                                   tzinfo=datetime.timezone.utc),
+     'naive': datetime.datetime(2021, 5, 1, 12, 30),
+     'offset': datetime.datetime(
+         2021, 5, 1, 12, 30,
+         tzinfo=datetime.timezone(datetime.timedelta(hours=3))),
+     'date': datetime.date(2021, 5, 1),
+     'time': datetime.time(12, 30, 15, 500),
+     'delta': datetime.timedelta(minutes=90)},
+    {'decimal': decimal.Decimal('7.25'), 'uuid': uuid.UUID(int=1),
+     'lazy': gettext_lazy('Not found.'), 'bytes': b'abc',
+     'tuple': (1, 2), 'big': 2 ** 70},
+]
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def renderer_backend(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr('api.renderers.orjson', None)
+        monkeypatch.setattr('api.parsers.orjson', None)
+    return request.param
+
+
+class TestFastJSON:
+
+    @pytest.mark.parametrize('data', SAMPLES)
+    def test_render_matches_drf(self, data, renderer_backend):
+        from api.renderers import FastJSONRenderer
+
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(
+            data), 'Проверьте, что ответ совпадает с JSONRenderer байт в байт'
+        media_type = 'application/json; indent=4'
+        assert FastJSONRenderer().render(data, media_type) == (
+            JSONRenderer().render(data, media_type))
+
+    def test_parse_matches_drf(self, renderer_backend):
+        from api.parsers import FastJSONParser
+
+        for body in (b'{"name": "\xd0\x98\xd0\xbc\xd1\x8f", "genre": ["a"]}',
+                     b'[1, 2.5, null, true]', b'{"big": 1180591620717411303424}'):
+            assert FastJSONParser().parse(BytesIO(body)) == (
+                JSONParser().parse(BytesIO(body)))
+        for body in (b'{"score": NaN}', b'{"name": ', b''):
+            with pytest.raises(ParseError) as fast:
+                FastJSONParser().parse(BytesIO(body))
+            with pytest.raises(ParseError) as stdlib:
+                JSONParser().parse(BytesIO(body))
+            assert str(fast.value) == str(stdlib.value), (
+                'Проверьте, что ошибки разбора совпадают с JSONParser'
+            )
+
+
+@pytest.mark.django_db
+class TestFastJSONEndpoints:
+
+    def test_pages_match_drf(self, client, reviews, renderer_backend):
+        from reviews.models import Review
+
+        title_id = reviews[0].title_id
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{title_id}/',
+                    f'/api/v1/titles/{title_id}/reviews/'):
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response['Content-Type'] == 'application/json'
+            assert response.content == JSONRenderer().render(response.data)
+        Review.objects.filter(pk=reviews[0].pk).update(
+            pub_date=timezone.now().replace(microsecond=123456))
+        rows = list(Review.objects.values('id', 'pub_date'))
+        from api.renderers import FastJSONRenderer
+        assert FastJSONRenderer().render(rows) == JSONRenderer().render(
+            rows), 'Проверьте кодирование pub_date'
+
+    def test_json_body(self, admin_client, renderer_backend):
+        response = admin_client.post(
+            '/api/v1/genres/', '{"name": "Нуар", "slug": "noir"}',
+            content_type='application/json')
+        assert response.status_code == 201
+        response = admin_client.post(
+            '/api/v1/genres/', '{"name": ', content_type='application/json')
+        assert response.status_code == 400
+        assert response.json()['detail'].startswith('JSON parse error')
+
+    def test_bench_renderers(self, reviews):
+        import json
+
+        call_command('generate_data', users=10, titles=20, reviews=50,
+                     comments=50, stdout=StringIO())
+        out = StringIO()
+        call_command('bench_serialization', rows=20, repeat=2, stdout=out)
+        report = json.loads(out.getvalue())
+        for name, result in report['renderers'].items():
+            assert {'bytes', 'stdlib_ms', 'fast_ms', 'speedup',
+                    'backend'} <= set(result), (
+                f'Проверьте поля отчёта рендера для {name}'
+            )
@@ -0,0 +1,117 @@
+import pytest
+
+
+@pytest.fixture
+def crowded_title(titles, django_user_model):
+    from reviews.models import Comments, Review
+
+    title = titles[0]
+    for number in range(15):
+        author = django_user_model.objects.create_user(
+            username=f'critic{number}', email=f'critic{number}@yamdb.fake')
+        review = Review.objects.create(title=title, author=author,
+                                       text=f'Отзыв {number}', score=7)
+        Comments.objects.create(review=review, author=author, text='Да')
+    for number in range(15):
+        author = django_user_model.objects.get(username=f'critic{number}')
+        Comments.objects.create(review=review, author=author, text='Нет')
+    return title
+
+
+@pytest.mark.django_db
+class TestReviewCommentQueries:
+    # Родитель, версии кэша, COUNT для пагинации и страница с авторами.
+    list_queries = 4
+
+    @pytest.mark.parametrize('limit', [1, 5, 15])
+    def test_reviews_list(self, client, crowded_title,
+                          django_assert_num_queries, limit):
+        url = f'/api/v1/titles/{crowded_title.id}/reviews/'
+        with django_assert_num_queries(self.list_queries):
+            response = client.get(url, {'limit': limit})
+        results = response.json()['results']
+        assert len(results) == limit
+        assert results[0]['title'] == crowded_title.name
+        assert results[0]['author'].startswith('critic')
+
+    @pytest.mark.parametrize('limit', [1, 5, 15])
+    def test_comments_list(self, client, crowded_title,
+                           django_assert_num_queries, limit):
+        review = crowded_title.review.order_by('-id').first()
+        url = (f'/api/v1/titles/{crowded_title.id}/reviews/{review.id}'
+               '/comments/')
+        with django_assert_num_queries(self.list_queries):
+            response = client.get(url, {'limit': limit})
+        results = response.json()['results']
+        assert len(results) == limit
+        assert all(comment['author'].startswith('critic')
+                   for comment in results)
+
+    def test_cursor_page(self, client, crowded_title,
+                         django_assert_num_queries):
+        url = f'/api/v1/titles/{crowded_title.id}/reviews/'
+        with django_assert_num_queries(self.list_queries - 1):
+            response = client.get(url, {'cursor': '', 'limit': 15})
+        assert len(response.json()['results']) == 15
+
+
+@pytest.mark.django_db
+class TestParentLookup:
+
+    def title_selects(self, context):
+        return [query['sql'] for query in context.captured_queries
+                if query['sql'].startswith('SELECT')
+                and 'FROM "reviews_title"' in query['sql']]
+
+    def test_review_post_reads_title_once(self, user_client, titles):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = f'/api/v1/titles/{titles[3].id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, {'text': 'Хорошо', 'score': 8})
+        assert response.status_code == 201
+        assert response.json()['title'] == titles[3].name
+        assert len(self.title_selects(context)) == 1, (
+            'Проверьте, что произведение читается один раз за запрос'
+        )
+
+    def test_duplicate_review(self, user_client, titles):
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{titles[3].id}/reviews/'
+        user_client.post(url, {'text': 'Хорошо', 'score': 8})
+        response = user_client.post(url, {'text': 'Ещё раз', 'score': 2})
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': [
+            'Пользователь может оставить только один отзыв.']}
+        assert Review.objects.filter(title=titles[3]).count() == 1
+        titles[3].refresh_from_db()
+        assert titles[3].rating == 8, (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+
+    def test_other_integrity_error(self, user_client, titles, monkeypatch):
+        from django.db import IntegrityError
+        from reviews.models import TitleScore
+
+        def broken_shift(*args, **kwargs):
+            raise IntegrityError('CHECK constraint failed')
+
+        monkeypatch.setattr(TitleScore.objects, 'shift', broken_shift)
+        url = f'/api/v1/titles/{titles[3].id}/reviews/'
+        with pytest.raises(IntegrityError):
+            user_client.post(url, {'text': 'Хорошо', 'score': 8})
+
+    def test_comment_review_must_belong_to_title(self, user_client, client,
+                                                 titles, reviews):
+        foreign = f'/api/v1/titles/{titles[5].id}/reviews/{reviews[0].id}'
+        assert client.get(f'{foreign}/comments/').status_code == 404, (
+            'Проверьте, что отзыв другого произведения не находится'
+        )
+        response = user_client.post(f'{foreign}/comments/', {'text': 'Да'})
+        assert response.status_code == 404
+        own = f'/api/v1/titles/{titles[0].id}/reviews/{reviews[0].id}'
+        response = user_client.post(f'{own}/comments/', {'text': 'Да'})
+        assert response.status_code == 201
+        assert response.json()['review'] == reviews[0].id
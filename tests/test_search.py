@@ -0,0 +1,107 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    @pytest.fixture
+    def library(self, categories):
+        from reviews.models import Title
+
+        return [
+            Title.objects.create(
+                name='Матрица', year=1999, category=categories[0],
+                description='Хакер узнаёт правду о мире'),
+            Title.objects.create(
+                name='Хакеры', year=1995, category=categories[0],
+                description='Подростки взламывают корпорацию'),
+            Title.objects.create(
+                name='Солярис', year=1961, category=categories[1],
+                description='Океан планеты Солярис'),
+        ]
+
+    def search(self, client, query):
+        response = client.get('/api/v1/titles/', {'search': query})
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    def test_ranking(self, client, library):
+        assert self.search(client, 'океан') == ['Солярис'], (
+            'Проверьте, что поиск учитывает описание'
+        )
+        assert self.search(client, 'хакер') == ['Хакеры', 'Матрица'], (
+            'Проверьте, что совпадение в названии весит больше, чем в описании'
+        )
+        assert self.search(client, 'правду о мире хакер') == [
+            'Матрица', 'Хакеры'], (
+            'Проверьте, что релевантность — сумма весов совпавших слов'
+        )
+
+    def test_prefix_and_normalization(self, client, library):
+        assert self.search(client, 'СОЛЯ') == ['Солярис'], (
+            'Проверьте, что последнее слово запроса ищется как префикс'
+        )
+        assert self.search(client, 'узнает') == ['Матрица'], (
+            'Проверьте, что ё и е не различаются'
+        )
+        assert self.search(client, 'ма') == [], (
+            'Короткий префикс не должен совпадать с началом слов'
+        )
+
+    def test_index_follows_updates(self, admin_client, client, library):
+        response = admin_client.patch(
+            f'/api/v1/titles/{library[2].id}/', {'name': 'Сталкер'})
+        assert response.status_code == 200
+        assert self.search(client, 'сталкер') == ['Сталкер'], (
+            'Проверьте, что индекс обновляется при изменении произведения'
+        )
+        library[0].delete()
+        assert self.search(client, 'правду') == []
+
+    def test_cursor_pages(self, client, titles):
+        response = client.get('/api/v1/titles/',
+                              {'search': 'произведение', 'cursor': '',
+                               'limit': 5})
+        names = [title['name'] for title in response.json()['results']]
+        next_url = response.json()['next']
+        while next_url:
+            response = client.get(next_url)
+            names += [title['name'] for title in response.json()['results']]
+            next_url = response.json()['next']
+        assert sorted(names) == sorted(title.name for title in titles), (
+            'Проверьте, что страницы поиска по курсору не теряют строк'
+        )
+
+    def test_autocomplete(self, client, library, django_assert_num_queries):
+        # Версии кэша и два запроса подсказок.
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/autocomplete/',
+                                  {'q': 'хак'})
+        assert response.status_code == 200
+        assert response.json() == [
+            {'id': library[1].id, 'name': 'Хакеры'},
+            {'id': library[0].id, 'name': 'Матрица'},
+        ]
+        response = client.get('/api/v1/titles/autocomplete/',
+                              {'q': 'правду о м'})
+        assert response.json() == [{'id': library[0].id, 'name': 'Матрица'}]
+        response = client.get('/api/v1/titles/autocomplete/', {'q': ' '})
+        assert response.json() == []
+
+    def test_autocomplete_window(self, library, categories):
+        from reviews.models import Title
+
+        for number in range(5):
+            Title.objects.create(name=f'Сериал {number}', year=2000,
+                                 category=categories[0],
+                                 description='Про хакеров')
+        titles = Title.objects.autocomplete('хак', limit=5, window=2)
+        assert titles == [{'id': library[0].id, 'name': 'Матрица'},
+                          {'id': Title.objects.get(name='Сериал 0').id,
+                           'name': 'Сериал 0'}], (
+            'Проверьте, что окно подсказок — первые строки индекса слов'
+        )
+        titles = Title.objects.autocomplete('хакеры', limit=1, window=1)
+        assert titles == [{'id': library[1].id, 'name': 'Хакеры'}], (
+            'Проверьте, что внутри слова совпадения в названии идут первыми'
+        )
@@ -0,0 +1,47 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestSignup:
+    url = '/api/v1/auth/signup/'
+
+    def test_signup_cases(self, client, user):
+        response = client.post(self.url, data={
+            'username': user.username, 'email': user.email})
+        assert response.status_code == 200, (
+            'Проверьте, что повторная регистрация с теми же данными проходит'
+        )
+        response = client.post(self.url, data={
+            'username': user.username, 'email': 'other@yamdb.fake'})
+        assert response.json() == {'non_field_errors': [
+            'Пользователь с таким именем уже существует']}
+        response = client.post(self.url, data={
+            'username': 'other', 'email': user.email})
+        assert response.json() == {'non_field_errors': [
+            'Такой email уже используется']}
+
+    def test_signup_queries(self, client, django_assert_max_num_queries):
+        # Выборка существующих, вставка и её точка сохранения.
+        with django_assert_max_num_queries(4):
+            response = client.post(self.url, data={
+                'username': 'newcomer', 'email': 'newcomer@yamdb.fake'})
+        assert response.status_code == 200
+
+    def test_race_on_insert(self, client, django_user_model, monkeypatch):
+        from api.serializers import UserRegistrationSerializer
+
+        validate = UserRegistrationSerializer.validate
+
+        def validate_then_race(serializer, data):
+            data = validate(serializer, data)
+            # Другой запрос успевает занять имя между проверкой и вставкой.
+            django_user_model.objects.create(
+                username=data['username'], email='racer@yamdb.fake')
+            return data
+
+        monkeypatch.setattr(UserRegistrationSerializer, 'validate',
+                            validate_then_race)
+        response = client.post(self.url, data={
+            'username': 'racer', 'email': 'first@yamdb.fake'})
+        assert response.status_code == 400
+        assert django_user_model.objects.filter(username='racer').count() == 1
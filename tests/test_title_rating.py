@@ -0,0 +1,122 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_reviews(self, user_client, another_user_client,
+                                    titles):
+        from reviews.models import Title
+
+        title = titles[0]
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, data={'text': 'a', 'score': 10})
+        assert response.status_code == 201
+        another_user_client.post(url, data={'text': 'b', 'score': 5})
+        title = Title.objects.get(pk=title.pk)
+        assert (title.review_count, title.score_sum, title.rating) == (
+            2, 15, 8), 'Проверьте, что рейтинг обновляется при создании отзыва'
+
+        review_url = f'{url}{response.json()["id"]}/'
+        user_client.patch(review_url, data={'score': 1})
+        title = Title.objects.get(pk=title.pk)
+        assert (title.review_count, title.score_sum, title.rating) == (
+            2, 6, 3), (
+            'Проверьте, что рейтинг обновляется при изменении оценки'
+        )
+
+        user_client.delete(review_url)
+        title = Title.objects.get(pk=title.pk)
+        assert (title.review_count, title.score_sum, title.rating) == (
+            1, 5, 5), 'Проверьте, что рейтинг обновляется при удалении отзыва'
+
+        response = user_client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == 5
+
+    def test_rebuild_ratings(self, reviews):
+        from reviews.models import Title
+
+        Title.objects.update(review_count=0, score_sum=0, rating=None)
+        call_command('rebuild_ratings', stdout=StringIO())
+        title = Title.objects.get(pk=reviews[0].title_id)
+        assert (title.review_count, title.score_sum, title.rating) == (
+            2, 15, 8), 'Проверьте команду rebuild_ratings'
+        empty = Title.objects.exclude(review__isnull=False).first()
+        assert (empty.review_count, empty.rating) == (0, None)
+
+    @pytest.mark.parametrize('scores,expected', [
+        ((10,), 10), ((7, 8), 8), ((6, 7, 7), 7), ((1, 1, 2), 1),
+        ((5, 6, 6, 6, 6), 6), ((1, 2), 2), ((9, 10, 10, 10), 10)])
+    def test_rounding(self, titles, scores, expected):
+        from reviews.models import Title
+
+        Title.objects.filter(pk=titles[0].pk).apply_review_delta(
+            len(scores), sum(scores))
+        assert Title.objects.get(pk=titles[0].pk).rating == expected, (
+            'Проверьте, что рейтинг округляется до ближайшего целого, '
+            'половина — вверх'
+        )
+
+    def test_ordering_and_filters(self, client, titles):
+        from reviews.models import Title
+
+        for title, (count, total) in zip(
+                titles, [(2, 15), (1, 3), (4, 36), (3, 21), (1, 8)]):
+            Title.objects.filter(pk=title.pk).apply_review_delta(count, total)
+        ids = [title.pk for title in titles]
+
+        def result(**params):
+            response = client.get('/api/v1/titles/', params)
+            assert response.status_code == 200, response.json()
+            return [row['id'] for row in response.json()['results']]
+
+        unrated = ids[5:]
+        assert result(ordering='-rating', limit=50) == [
+            ids[2], ids[4], ids[0], ids[3], ids[1], *reversed(unrated)], (
+            'Проверьте ?ordering=-rating: по убыванию, при равенстве по id, '
+            'произведения без отзывов — в конце'
+        )
+        assert result(ordering='rating', limit=50) == [
+            ids[1], ids[3], ids[0], ids[4], ids[2], *unrated], (
+            'Проверьте, что произведения без отзывов идут последними и при '
+            'сортировке по возрастанию'
+        )
+        assert result(ordering='-rating', min_rating=7, max_rating=8) == [
+            ids[4], ids[0], ids[3]]
+        assert set(result(min_rating=9, limit=50)) == {ids[2]}
+        genre = titles[2].genre.first().slug
+        assert result(genre=genre, ordering='-rating')[0] == ids[2]
+
+        first = client.get('/api/v1/titles/', {
+            'ordering': '-rating', 'cursor': '', 'limit': 2}).json()
+        second = client.get(first['next']).json()
+        assert [row['rating'] for row in
+                first['results'] + second['results']] == [9, 8, 8, 7], (
+            'Проверьте постраничный вывод по курсору в порядке рейтинга'
+        )
+        back = client.get(second['previous']).json()
+        assert back['results'] == first['results']
+
+        for ordering in ('rating', '-rating'):
+            pages = []
+            url = f'/api/v1/titles/?ordering={ordering}&cursor=&limit=4'
+            while url:
+                page = client.get(url).json()
+                pages.append([row['id'] for row in page['results']])
+                url = page['next']
+            assert sum(pages, []) == result(ordering=ordering, limit=50), (
+                'Проверьте, что курсор проходит и произведения без отзывов'
+            )
+            url = f'/api/v1/titles/?ordering={ordering}&cursor=&limit=4'
+            for _ in pages[1:]:
+                url = client.get(url).json()['next']
+            previous = client.get(client.get(url).json()['previous']).json()
+            assert [row['id'] for row in previous['results']] == pages[-2]
+
+        for params in ({'ordering': 'year'}, {'min_rating': 'семь'},
+                       {'min_rating': '99999999999999999999'},
+                       {'max_rating': '-1'}):
+            assert client.get('/api/v1/titles/', params).status_code == 400
@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitlesQueries:
+    # Версии кэша, COUNT для пагинации, страница с категориями, жанры.
+    list_queries = 4
+
+    @pytest.mark.parametrize('query', [
+        '',
+        '?genre=drama',
+        '?category=movie',
+        '?year=1990',
+        '?name=Произведение 3',
+        '?genre=drama&category=book&year=1991',
+        '?limit=100',
+    ])
+    def test_list_queries(self, client, titles,
+                          django_assert_num_queries, query):
+        with django_assert_num_queries(self.list_queries):
+            response = client.get(f'/api/v1/titles/{query}')
+        assert response.status_code == 200
+        assert response.json()['results'], (
+            'Проверьте, что фильтр возвращает произведения'
+        )
+
+    def test_detail_queries(self, client, titles, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[5].id}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 3
@@ -0,0 +1,85 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+class TestValuesSerializers:
+
+    @pytest.fixture
+    def catalogue(self, reviews):
+        from reviews.models import Title
+
+        call_command('generate_data', users=20, titles=40, reviews=300,
+                     comments=300, seed=3, stdout=StringIO())
+        Title.objects.create(name='Без категории', year=2000,
+                             description=None)
+        Title.objects.filter(pk=reviews[0].title_id).update(rating=8)
+
+    def test_titles(self, catalogue):
+        from api.serializers import TitleSerializerGet, TitleValuesSerializer
+        from reviews.models import Title
+
+        queryset = (Title.objects.select_related('category')
+                    .prefetch_related('genre').order_by('id'))
+        fast = TitleValuesSerializer()
+        assert render(fast.many(fast.rows(queryset))) == render(
+            TitleSerializerGet(queryset, many=True).data), (
+            'Проверьте, что быстрый сериализатор произведений выдаёт тот же JSON'
+        )
+
+    def test_reviews_and_comments(self, catalogue):
+        from api.serializers import (CommentSerializer,
+                                     CommentValuesSerializer,
+                                     ReviewSerializer, ReviewValuesSerializer)
+        from reviews.models import Review, Title
+
+        for title in Title.objects.filter(review_count__gt=0)[:10]:
+            queryset = title.review.select_related('author').order_by('id')
+            fast = ReviewValuesSerializer(context={'parent': title})
+            assert render(fast.many(fast.rows(queryset))) == render(
+                ReviewSerializer(queryset, many=True).data), (
+                'Проверьте, что быстрый сериализатор отзывов выдаёт тот же JSON'
+            )
+        for review in Review.objects.order_by('id')[:20]:
+            queryset = review.comments.select_related('author').order_by('id')
+            fast = CommentValuesSerializer(context={'parent': review})
+            assert render(fast.many(fast.rows(queryset))) == render(
+                CommentSerializer(queryset, many=True).data)
+
+    def test_endpoints(self, client, catalogue):
+        from api.serializers import TitleSerializerGet
+        from reviews.models import Title
+
+        response = client.get('/api/v1/titles/', {'search': 'произведение',
+                                                  'cursor': '', 'limit': 5})
+        assert response.status_code == 200
+        page = response.json()
+        expected = (Title.objects.search('произведение')
+                    .select_related('category').prefetch_related('genre')[:5])
+        assert page['results'] == TitleSerializerGet(expected, many=True).data
+        response = client.get(page['next'])
+        assert response.status_code == 200, (
+            'Проверьте, что курсор строится из строк values()'
+        )
+        assert response.json()['results'][0]['id'] not in {
+            title['id'] for title in page['results']}
+
+    def test_bench_serialization(self, catalogue):
+        import json
+
+        out = StringIO()
+        call_command('bench_serialization', rows=50, repeat=2, stdout=out)
+        report = json.loads(out.getvalue())
+        assert set(report['serializers']) == {'titles', 'reviews', 'comments'}
+        for name, result in report['serializers'].items():
+            assert {'model_ms_per_1000', 'values_ms_per_1000',
+                    'speedup'} <= set(result), (
+                f'Проверьте поля отчёта для {name}'
+            )